@@ -0,0 +1,31 @@
+"""Add composite index for referral bonus lookups
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Covers _grant_bonus_if_due: filter by referrer and bonus_granted,
+    # then take the oldest referrals by created_at
+    op.create_index(
+        'ix_referrals_referrer_bonus_created',
+        'referrals',
+        ['referrer_user_id', 'bonus_granted', 'created_at'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_referrals_referrer_bonus_created', table_name='referrals')
@@ -0,0 +1,33 @@
+"""Add partial index for referrals without granted bonus
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-16 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Partial index matching the `NOT bonus_granted` predicate used when
+    # picking the oldest referrals to mark as bonus_granted
+    op.create_index(
+        'ix_referrals_ungranted',
+        'referrals',
+        ['referrer_user_id', 'created_at'],
+        postgresql_where=sa.text('NOT bonus_granted'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_referrals_ungranted', table_name='referrals')
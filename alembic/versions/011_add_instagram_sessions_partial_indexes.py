@@ -0,0 +1,42 @@
+"""Add partial indexes for active Instagram sessions
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Newest active+valid session is a one-row backward scan
+    op.create_index(
+        'ix_instagram_sessions_active_valid',
+        'instagram_sessions',
+        ['created_at'],
+        postgresql_where=sa.text('is_active AND is_valid'),
+    )
+    # Replaces the full boolean index on is_active
+    op.drop_index('ix_instagram_sessions_is_active', table_name='instagram_sessions')
+    op.create_index(
+        'ix_instagram_sessions_active',
+        'instagram_sessions',
+        ['created_at'],
+        postgresql_where=sa.text('is_active'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_instagram_sessions_active', table_name='instagram_sessions')
+    op.create_index('ix_instagram_sessions_is_active', 'instagram_sessions', ['is_active'])
+    op.drop_index('ix_instagram_sessions_active_valid', table_name='instagram_sessions')
@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import get_instagram_session_id, get_settings, set_instagram_session_id
 from app.models.database import get_session
 from app.models.models import Check, CheckStatusEnum, Payment, PaymentMethodEnum, PaymentStatusEnum, User
+from app.services.session_service import refresh_session_cache
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -59,6 +60,8 @@ class SessionResponse(BaseModel):
 @router.get("/session", response_model=SessionResponse)
 async def get_session_status(admin_id: int = Depends(verify_admin)):
     """Get current Instagram session status (masked)."""
+    # Admins see the database's current session, not a cached copy
+    await refresh_session_cache(force=True)
     session_id = get_instagram_session_id()
     
     if session_id:
@@ -79,6 +82,7 @@ async def update_session(
     admin_id: int = Depends(verify_admin),
 ):
     """Update Instagram session ID without server restart."""
+    await refresh_session_cache(force=True)
     old_session = get_instagram_session_id()
     set_instagram_session_id(request.session_id)
     
@@ -1,5 +1,8 @@
 """FastAPI router for referral endpoints."""
 
+import base64
+import uuid
+from datetime import datetime
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -22,6 +25,29 @@ from app.utils.logger import logger
 router = APIRouter(prefix="/referrals", tags=["referrals"])
 
 
+def _encode_cursor(cursor: tuple[datetime, uuid.UUID] | None) -> str | None:
+    """Encode a referral list cursor as an opaque URL-safe string."""
+    if cursor is None:
+        return None
+    created_at, referral_id = cursor
+    raw = f"{created_at.isoformat()}_{referral_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Decode a referral list cursor produced by _encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, referral_id = raw.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(referral_id)
+    except ValueError:
+        # Also covers binascii.Error and UnicodeDecodeError
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
 @router.get("/stats", response_model=ReferralStatsResponse)
 async def get_stats(
     user_id: int,
@@ -45,9 +71,15 @@ async def get_list(
     session: Annotated[AsyncSession, Depends(get_session)],
     limit: int = 20,
     offset: int = 0,
+    cursor: str | None = None,
 ):
-    """Get list of referrals made by a user."""
-    result = await get_referral_list(user_id, limit, offset)
+    """Get list of referrals made by a user.
+    
+    Use `next_cursor` from the response as `cursor` to page efficiently;
+    `offset` is kept for backwards compatibility.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    result = await get_referral_list(user_id, limit, offset, after=after)
     
     return ReferralListResponse(
         referrals=[
@@ -60,6 +92,7 @@ async def get_list(
             for r in result["referrals"]
         ],
         total=result["total"],
+        next_cursor=_encode_cursor(result["next_cursor"]),
     )
 
 
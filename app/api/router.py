@@ -101,7 +101,7 @@ async def initiate_check(
     logger.info(f"Created check {check.check_id} for @{request.username} (balance: {user.checks_balance})")
 
     # Add to processing queue
-    queue_position = await add_to_queue(str(check.check_id))
+    queue_position = await add_to_queue(check.check_id)
 
     # Estimate time based on queue position
     estimated_time = 60 + (queue_position - 1) * 120  # Base 60s + 2min per position
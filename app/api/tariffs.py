@@ -16,6 +16,7 @@ from app.models.schemas import (
     TariffResponse,
     TariffUpdate,
 )
+from app.services.payment_service import invalidate_tariff_cache
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/tariffs", tags=["tariffs"])
@@ -179,6 +180,7 @@ async def update_tariff(
 
     await session.commit()
     await session.refresh(tariff)
+    invalidate_tariff_cache(tariff_id)
 
     logger.info(f"Admin {admin_id} updated tariff {tariff_id}: {update_data}")
 
@@ -216,6 +218,7 @@ async def deactivate_tariff(
 
     tariff.is_active = False
     await session.commit()
+    invalidate_tariff_cache(tariff_id)
 
     logger.info(f"Admin {admin_id} deactivated tariff {tariff_id}")
 
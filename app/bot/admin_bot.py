@@ -13,6 +13,7 @@ from aiogram.enums import ParseMode
 
 from app.bot.handlers.admin import router as admin_router
 from app.config import get_settings
+from app.services.session_service import close_http_client
 from app.utils.logger import logger
 
 settings = get_settings()
@@ -46,6 +47,7 @@ async def main():
         await dp.start_polling(bot)
     finally:
         await bot.session.close()
+        await close_http_client()
 
 
 if __name__ == "__main__":
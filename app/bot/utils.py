@@ -4,6 +4,16 @@ from app.config import get_settings
 
 settings = get_settings()
 
+# Every bar of the default sizes, indexed by filled segment count
+_PROGRESS_BARS = {
+    length: tuple("█" * filled + "░" * (length - filled) for filled in range(length + 1))
+    for length in (10, 20)
+}
+_REFERRAL_PROGRESS_BARS = {
+    total: tuple("🟢" * done + "⚪" * (total - done) for done in range(total + 1))
+    for total in (10,)
+}
+
 
 def get_api_url(path: str) -> str:
     """Get full API URL for a given path.
@@ -75,6 +85,10 @@ def create_progress_bar(progress: int, length: int = 10) -> str:
         Progress bar string (e.g., "█████░░░░░")
     """
     filled = int(progress / 100 * length)
+    bars = _PROGRESS_BARS.get(length)
+    if bars is not None and 0 <= filled <= length:
+        return bars[filled]
+    
     empty = length - filled
     return "█" * filled + "░" * empty
 
@@ -89,5 +103,9 @@ def create_referral_progress_bar(progress: int, total: int = 10) -> str:
     Returns:
         Progress bar with emojis (e.g., "🟢🟢🟢⚪⚪⚪⚪⚪⚪⚪")
     """
+    bars = _REFERRAL_PROGRESS_BARS.get(total)
+    if bars is not None and 0 <= progress <= total:
+        return bars[progress]
+    
     return "🟢" * progress + "⚪" * (total - progress)
 
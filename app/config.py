@@ -1,7 +1,7 @@
 """Application configuration settings."""
 
 import os
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from pathlib import Path
 
 from pydantic import Field
@@ -15,6 +15,8 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         extra="ignore",
+        # Settings are read-only after load, so derived values can be cached
+        frozen=True,
     )
 
     # Database
@@ -68,9 +70,9 @@ class Settings(BaseSettings):
         path.mkdir(parents=True, exist_ok=True)
         return path
 
-    @property
+    @cached_property
     def admin_ids(self) -> list[int]:
-        """Get list of admin user IDs."""
+        """Get list of admin user IDs (parsed once)."""
         if not self.admin_user_ids:
             return []
         return [int(uid.strip()) for uid in self.admin_user_ids.split(",") if uid.strip()]
@@ -12,6 +12,7 @@ from app.api.router import router as api_router
 from app.api.tariffs import router as tariffs_router
 from app.config import get_settings
 from app.models.database import init_db
+from app.services.session_service import start_session_listener
 from app.utils.logger import logger
 
 
@@ -24,9 +25,18 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
 
+    # Drop cached Instagram session IDs when another process changes them
+    session_listener = None
+    try:
+        session_listener = await start_session_listener()
+    except Exception as e:
+        logger.warning(f"Session notifications unavailable, relying on cache TTL: {e}")
+
     yield
 
     logger.info("Shutting down Mutual Followers Analyzer API...")
+    if session_listener is not None:
+        await session_listener.close()
 
 
 settings = get_settings()
@@ -1,19 +1,28 @@
 """Database connection and session management."""
 
+import asyncio
+from collections.abc import Callable
+from contextlib import suppress
+
+import asyncpg
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import get_settings
+from app.utils.logger import logger
 
 settings = get_settings()
 
 # Create async engine
+# Pool is sized so the queue worker's concurrent checks never wait for a
+# connection; recycling drops connections before server-side idle timeouts.
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     pool_pre_ping=True,
-    pool_size=10,
+    pool_size=max(10, settings.max_concurrent_checks * 2),
     max_overflow=20,
+    pool_recycle=1800,
 )
 
 # Session factory
@@ -26,6 +35,88 @@ async_session_maker = async_sessionmaker(
 )
 
 
+# LISTEN connections: pause between reconnect attempts, and how long an idle
+# connection may go before it is pinged (a dead TCP peer is not always reported)
+LISTEN_RECONNECT_DELAY_SECONDS = 5.0
+LISTEN_PING_INTERVAL_SECONDS = 30.0
+
+
+class NotifyListener:
+    """LISTEN on a PostgreSQL channel over a dedicated connection.
+
+    The connection is opened with asyncpg directly rather than taken from the
+    engine pool, and is re-established (and re-subscribed) whenever it drops.
+    Notifications sent while disconnected are lost, so ``callback`` is also
+    invoked once after every reconnect.
+    """
+
+    def __init__(self, channel: str, callback: Callable[..., None]):
+        """Create a listener (call start() to begin listening).
+
+        Args:
+            channel: Channel name to LISTEN on
+            callback: asyncpg notification callback (connection, pid, channel, payload)
+        """
+        self.channel = channel
+        self.callback = callback
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start listening in a background task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop listening and close the connection."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        """Keep a subscribed connection open until cancelled."""
+        # asyncpg takes a plain postgresql:// DSN
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        reconnect = False
+
+        while True:
+            try:
+                conn = await asyncpg.connect(dsn)
+            except Exception as e:
+                logger.warning(f"LISTEN '{self.channel}': connect failed, retrying: {e}")
+                await asyncio.sleep(LISTEN_RECONNECT_DELAY_SECONDS)
+                continue
+
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _conn: lost.set())
+            try:
+                await conn.add_listener(self.channel, self.callback)
+                logger.info(f"Listening for notifications on '{self.channel}'")
+                if reconnect:
+                    # Anything sent while we were disconnected was missed
+                    self.callback(conn, None, self.channel, None)
+
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), LISTEN_PING_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        await conn.execute("SELECT 1", timeout=LISTEN_PING_INTERVAL_SECONDS)
+                logger.warning(f"LISTEN '{self.channel}': connection lost, reconnecting")
+            except Exception as e:
+                logger.warning(f"LISTEN '{self.channel}': connection error, reconnecting: {e}")
+            finally:
+                if not conn.is_closed():
+                    with suppress(Exception):
+                        await conn.remove_listener(self.channel, self.callback)
+                    # Aborts the connection itself if it can't close cleanly
+                    with suppress(Exception):
+                        await conn.close(timeout=LISTEN_RECONNECT_DELAY_SECONDS)
+
+            reconnect = True
+            await asyncio.sleep(LISTEN_RECONNECT_DELAY_SECONDS)
+
+
 class Base(DeclarativeBase):
     """Base class for all database models."""
 
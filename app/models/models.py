@@ -5,7 +5,18 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 
-from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    text,
+)
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.dialects.postgresql import JSON, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -308,6 +319,22 @@ class Referral(Base):
     """Referral relationship model."""
 
     __tablename__ = "referrals"
+    __table_args__ = (
+        # Backs the bonus lookups: per referrer, filtered by bonus_granted, oldest first
+        Index(
+            "ix_referrals_referrer_bonus_created",
+            "referrer_user_id",
+            "bonus_granted",
+            "created_at",
+        ),
+        # Only referrals still waiting for a bonus (shrinks as bonuses are granted)
+        Index(
+            "ix_referrals_ungranted",
+            "referrer_user_id",
+            "created_at",
+            postgresql_where=text("NOT bonus_granted"),
+        ),
+    )
 
     referral_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -343,6 +370,22 @@ class InstagramSession(Base):
     """Instagram session storage for persistent session management."""
 
     __tablename__ = "instagram_sessions"
+    __table_args__ = (
+        # Backs get_active_session_id: newest active+valid session
+        Index(
+            "ix_instagram_sessions_active_valid",
+            "created_at",
+            postgresql_where=text("is_active AND is_valid"),
+        ),
+        # Backs the `is_active` UPDATEs and get_session_info
+        Index(
+            "ix_instagram_sessions_active",
+            "created_at",
+            postgresql_where=text("is_active"),
+        ),
+    )
+    # Fetch server defaults (id, created_at) with RETURNING on INSERT
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     session_id: Mapped[str] = mapped_column(Text, nullable=False)
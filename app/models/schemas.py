@@ -380,6 +380,7 @@ class ReferralListResponse(BaseModel):
 
     referrals: list[ReferralListItem]
     total: int
+    next_cursor: str | None = None  # Pass as `cursor` to fetch the next page
 
 
 class ReferralRegisterRequest(BaseModel):
@@ -1,5 +1,6 @@
 """Admin notification service for sending alerts to administrators."""
 
+import uuid
 from datetime import datetime
 
 import httpx
@@ -109,7 +110,7 @@ async def notify_admin_check_started(
     user_id: int,
     username: str | None,
     target_username: str,
-    check_id: str,
+    check_id: uuid.UUID,
 ) -> None:
     """Notify admins about a new check being started."""
     notifier = get_admin_notifier()
@@ -123,7 +124,7 @@ async def notify_admin_check_started(
 🆔 User ID: <code>{user_id}</code>
 
 📱 Аккаунт: @{target_username}
-🔖 Check ID: <code>{check_id[:8]}...</code>
+🔖 Check ID: <code>{str(check_id)[:8]}...</code>
 
 🕐 Время: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}
 """
@@ -135,7 +136,7 @@ async def notify_admin_check_error(
     user_id: int,
     username: str | None,
     target_username: str,
-    check_id: str,
+    check_id: uuid.UUID,
     error_type: str,
     error_message: str,
 ) -> None:
@@ -157,7 +158,7 @@ async def notify_admin_check_error(
 👤 Пользователь: {user_mention}
 🆔 User ID: <code>{user_id}</code>
 📱 Аккаунт: @{target_username}
-🔖 Check ID: <code>{check_id[:8]}...</code>
+🔖 Check ID: <code>{str(check_id)[:8]}...</code>
 
 ❌ <b>Тип ошибки:</b> {error_type}
 📝 <b>Сообщение:</b>
@@ -57,11 +57,11 @@ async def refund_check_balance(user_id: int, reason: str) -> bool:
         return False
 
 
-async def get_check_with_user(check_id: str) -> tuple[Check | None, User | None]:
+async def get_check_with_user(check_id: uuid.UUID) -> tuple[Check | None, User | None]:
     """Get check and associated user from database."""
     async with async_session_maker() as session:
         result = await session.execute(
-            select(Check).where(Check.check_id == uuid.UUID(check_id))
+            select(Check).where(Check.check_id == check_id)
         )
         check = result.scalar_one_or_none()
         
@@ -77,7 +77,7 @@ async def get_check_with_user(check_id: str) -> tuple[Check | None, User | None]
 
 
 async def update_check_status(
-    check_id: str,
+    check_id: uuid.UUID,
     status: CheckStatusEnum | None = None,
     progress: int | None = None,
     error_message: str | None = None,
@@ -94,7 +94,7 @@ async def update_check_status(
     """
     async with async_session_maker() as session:
         result = await session.execute(
-            select(Check).where(Check.check_id == uuid.UUID(check_id))
+            select(Check).where(Check.check_id == check_id)
         )
         check = result.scalar_one_or_none()
 
@@ -113,7 +113,7 @@ async def update_check_status(
             await session.commit()
 
 
-async def save_non_mutual_users(check_id: str, non_mutual_users: list):
+async def save_non_mutual_users(check_id: uuid.UUID, non_mutual_users: list):
     """Save non-mutual users to database.
 
     Args:
@@ -123,7 +123,7 @@ async def save_non_mutual_users(check_id: str, non_mutual_users: list):
     async with async_session_maker() as session:
         for user in non_mutual_users:
             non_mutual = NonMutualUser(
-                check_id=uuid.UUID(check_id),
+                check_id=check_id,
                 target_user_id=user.user_id,
                 target_username=user.username,
                 target_full_name=user.full_name,
@@ -138,7 +138,7 @@ async def save_non_mutual_users(check_id: str, non_mutual_users: list):
         logger.info(f"Saved {len(non_mutual_users)} non-mutual users for check {check_id}")
 
 
-async def process_check(check_id: str):
+async def process_check(check_id: uuid.UUID):
     """Process a followers check in background.
 
     This function:
@@ -149,7 +149,7 @@ async def process_check(check_id: str):
     5. Sends notifications to user and admins
 
     Args:
-        check_id: Check UUID string
+        check_id: Check UUID
     """
     logger.info(f"Starting check processing: {check_id}")
 
@@ -1,5 +1,6 @@
 """XLSX file generation for check results."""
 
+import uuid
 from datetime import datetime
 from pathlib import Path
 
@@ -221,7 +222,7 @@ def create_styled_workbook(
 
 
 async def generate_xlsx_report(
-    check_id: str,
+    check_id: uuid.UUID,
     target_username: str,
     followers: list[InstagramUser],
     following: list[InstagramUser],
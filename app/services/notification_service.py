@@ -117,23 +117,23 @@ def get_notifier() -> TelegramNotifier:
     return _notifier
 
 
-def get_manager_contact_url(check_id: str, target_username: str, error_message: str) -> str:
+def get_manager_contact_url(check_id: uuid.UUID, target_username: str, error_message: str) -> str:
     """Generate URL for contacting manager with pre-filled message."""
     manager = settings.manager_username
     message = (
         f"Здравствуйте! У меня возникла ошибка при проверке аккаунта @{target_username}.\n\n"
-        f"ID проверки: {check_id[:8]}...\n"
+        f"ID проверки: {str(check_id)[:8]}...\n"
         f"Ошибка: {error_message[:100]}\n\n"
         f"Прошу помочь разобраться с проблемой."
     )
     return f"https://t.me/{manager}?text={quote(message)}"
 
 
-async def notify_check_completed(check_id: str) -> bool:
+async def notify_check_completed(check_id: uuid.UUID) -> bool:
     """Send notification to user when their check is completed.
     
     Args:
-        check_id: The check UUID string
+        check_id: The check UUID
         
     Returns:
         True if notification was sent successfully
@@ -143,7 +143,7 @@ async def notify_check_completed(check_id: str) -> bool:
     async with async_session_maker() as session:
         # Get check with user
         result = await session.execute(
-            select(Check).where(Check.check_id == uuid.UUID(check_id))
+            select(Check).where(Check.check_id == check_id)
         )
         check = result.scalar_one_or_none()
         
@@ -1,11 +1,13 @@
 """Payment service for handling Telegram Stars payments."""
 
+import time
 import uuid
 from datetime import datetime, timezone
 from decimal import Decimal
 
-from sqlalchemy import select
+from sqlalchemy import inspect, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.models.models import (
     Payment,
@@ -19,6 +21,14 @@ from app.models.models import (
 from app.utils.logger import logger
 
 
+# Process-local cache of tariff rows (tariffs change rarely, read on every checkout).
+# Holds (cached_at, column values) snapshots, never live ORM instances, so a
+# rollback of the session that loaded a tariff can't expire the cached copy.
+_tariff_cache: dict[uuid.UUID, tuple[float, tuple[tuple[str, object], ...]]] = {}
+TARIFF_CACHE_TTL_SECONDS = 60
+TARIFF_CACHE_MAX_SIZE = 1_000
+
+
 class PaymentError(Exception):
     """Base exception for payment errors."""
 
@@ -67,6 +77,57 @@ class PaymentInvalidStatusError(PaymentError):
     pass
 
 
+def invalidate_tariff_cache(tariff_id: uuid.UUID | None = None) -> None:
+    """Drop cached tariff rows.
+    
+    Args:
+        tariff_id: Tariff to drop. If None, clears the whole cache.
+    """
+    if tariff_id is None:
+        _tariff_cache.clear()
+    else:
+        _tariff_cache.pop(tariff_id, None)
+
+
+async def get_tariff_cached(session: AsyncSession, tariff_id: uuid.UUID) -> Tariff | None:
+    """Get a tariff, serving it from the process-local cache when fresh.
+    
+    Cached rows are merged into the given session without a SELECT.
+    
+    Args:
+        session: Database session
+        tariff_id: Tariff UUID
+        
+    Returns:
+        Tariff attached to the session, or None if it doesn't exist
+    """
+    cached = _tariff_cache.get(tariff_id)
+    if cached and time.monotonic() - cached[0] < TARIFF_CACHE_TTL_SECONDS:
+        # Rebuild a detached copy from the snapshot and attach it
+        tariff = Tariff(**dict(cached[1]))
+        make_transient_to_detached(tariff)
+        return await session.merge(tariff, load=False)
+    
+    # Identity-map hit (e.g. tariff loaded earlier in this session) skips SQL
+    tariff = await session.get(Tariff, tariff_id)
+    
+    if tariff:
+        # Only loaded columns - reading an expired one would trigger a lazy load
+        loaded = inspect(tariff).dict
+        snapshot = tuple(
+            (attr.key, loaded[attr.key])
+            for attr in inspect(Tariff).column_attrs
+            if attr.key in loaded
+        )
+        if len(_tariff_cache) >= TARIFF_CACHE_MAX_SIZE:
+            _tariff_cache.clear()
+        _tariff_cache[tariff_id] = (time.monotonic(), snapshot)
+    else:
+        _tariff_cache.pop(tariff_id, None)
+    
+    return tariff
+
+
 async def log_payment_event(
     session: AsyncSession,
     payment_id: uuid.UUID,
@@ -128,21 +189,15 @@ async def create_telegram_stars_payment(
         TariffNotFoundError: If tariff doesn't exist
         TariffNotAvailableError: If tariff is inactive or doesn't support Stars
     """
-    # Verify user exists
-    user_result = await session.execute(
-        select(User).where(User.user_id == user_id)
-    )
-    user = user_result.scalar_one_or_none()
+    # Verify user exists (no SQL if the user is already in the session)
+    user = await session.get(User, user_id)
     
     if not user:
         logger.warning(f"User {user_id} not found for payment creation")
         raise UserNotFoundError(f"User {user_id} not found")
     
     # Get tariff
-    tariff_result = await session.execute(
-        select(Tariff).where(Tariff.tariff_id == tariff_id)
-    )
-    tariff = tariff_result.scalar_one_or_none()
+    tariff = await get_tariff_cached(session, tariff_id)
     
     if not tariff:
         logger.warning(f"Tariff {tariff_id} not found for payment creation")
@@ -261,6 +316,78 @@ async def validate_telegram_stars_payment(
     return payment
 
 
+async def _set_status_unless_completed(
+    session: AsyncSession,
+    payment: Payment,
+    new_status: PaymentStatusEnum,
+    **values,
+) -> bool:
+    """Atomically change payment status unless it has been completed meanwhile.
+    
+    The status predicate lives in the UPDATE itself, so two concurrent
+    callbacks cannot both pass a Python-side check and double-credit.
+    
+    Args:
+        session: Database session
+        payment: Payment to update (refreshed in place if the update loses)
+        new_status: Status to set
+        **values: Extra column values to set together with the status
+        
+    Returns:
+        True if this call changed the row, False if it was already completed
+    """
+    result = await session.execute(
+        update(Payment)
+        .where(Payment.payment_id == payment.payment_id)
+        .where(Payment.status != PaymentStatusEnum.COMPLETED)
+        .values(status=new_status, **values)
+    )
+    if result.rowcount == 1:
+        return True
+    
+    await session.refresh(payment)
+    return False
+
+
+async def _get_completed_payment_user(
+    session: AsyncSession,
+    payment: Payment,
+    telegram_payment_charge_id: str,
+) -> tuple[Payment, User]:
+    """Handle a completion request for an already completed payment.
+    
+    Args:
+        session: Database session
+        payment: Completed payment
+        telegram_payment_charge_id: Charge ID from Telegram
+        
+    Returns:
+        Tuple of (Payment, User) if the charge_id matches (idempotent)
+        
+    Raises:
+        PaymentAlreadyCompletedError: If completed with a different charge_id
+    """
+    if payment.telegram_payment_charge_id == telegram_payment_charge_id:
+        logger.info(
+            f"Payment {payment.payment_id} already completed with same charge_id, "
+            f"returning idempotent response"
+        )
+        # Get user for balance
+        user_result = await session.execute(
+            select(User).where(User.user_id == payment.user_id)
+        )
+        user = user_result.scalar_one_or_none()
+        return payment, user
+    
+    logger.error(
+        f"Payment {payment.payment_id} already completed with different charge_id: "
+        f"existing={payment.telegram_payment_charge_id}, new={telegram_payment_charge_id}"
+    )
+    raise PaymentAlreadyCompletedError(
+        f"Payment {payment.payment_id} already completed with different charge"
+    )
+
+
 async def complete_telegram_stars_payment(
     session: AsyncSession,
     payment_id: uuid.UUID,
@@ -295,25 +422,9 @@ async def complete_telegram_stars_payment(
     
     # Idempotency check - if already completed with same charge_id, return success
     if payment.status == PaymentStatusEnum.COMPLETED:
-        if payment.telegram_payment_charge_id == telegram_payment_charge_id:
-            logger.info(
-                f"Payment {payment_id} already completed with same charge_id, "
-                f"returning idempotent response"
-            )
-            # Get user for balance
-            user_result = await session.execute(
-                select(User).where(User.user_id == payment.user_id)
-            )
-            user = user_result.scalar_one_or_none()
-            return payment, user
-        else:
-            logger.error(
-                f"Payment {payment_id} already completed with different charge_id: "
-                f"existing={payment.telegram_payment_charge_id}, new={telegram_payment_charge_id}"
-            )
-            raise PaymentAlreadyCompletedError(
-                f"Payment {payment_id} already completed with different charge"
-            )
+        return await _get_completed_payment_user(
+            session, payment, telegram_payment_charge_id
+        )
     
     # Verify amount matches
     if int(payment.amount) != total_amount:
@@ -321,16 +432,23 @@ async def complete_telegram_stars_payment(
             f"Payment {payment_id} amount mismatch: "
             f"expected={payment.amount}, received={total_amount}"
         )
+        old_status = payment.status.value
+        if not await _set_status_unless_completed(
+            session, payment, PaymentStatusEnum.FAILED
+        ):
+            return await _get_completed_payment_user(
+                session, payment, telegram_payment_charge_id
+            )
+        
         # Log failed event
         await log_payment_event(
             session=session,
             payment_id=payment_id,
             event_type=PaymentEventTypeEnum.FAILED,
-            status_before=payment.status.value,
+            status_before=old_status,
             status_after=PaymentStatusEnum.FAILED.value,
             error_message=f"Amount mismatch: expected {payment.amount}, received {total_amount}",
         )
-        payment.status = PaymentStatusEnum.FAILED
         await session.commit()
         raise PaymentAmountMismatchError(
             f"Expected {payment.amount} XTR, received {total_amount} XTR"
@@ -346,13 +464,20 @@ async def complete_telegram_stars_payment(
         logger.error(f"User {payment.user_id} not found for payment {payment_id}")
         raise UserNotFoundError(f"User {payment.user_id} not found")
     
-    # Update payment
+    # Update payment (only the caller that flips the status credits the balance)
     old_status = payment.status.value
     old_balance = user.checks_balance
     
-    payment.status = PaymentStatusEnum.COMPLETED
-    payment.telegram_payment_charge_id = telegram_payment_charge_id
-    payment.completed_at = datetime.now(timezone.utc)
+    if not await _set_status_unless_completed(
+        session,
+        payment,
+        PaymentStatusEnum.COMPLETED,
+        telegram_payment_charge_id=telegram_payment_charge_id,
+        completed_at=datetime.now(timezone.utc),
+    ):
+        return await _get_completed_payment_user(
+            session, payment, telegram_payment_charge_id
+        )
     
     # Add checks to user balance
     user.checks_balance += payment.checks_count
@@ -422,7 +547,9 @@ async def fail_telegram_stars_payment(
         raise PaymentAlreadyCompletedError(f"Payment {payment_id} is already completed")
     
     old_status = payment.status.value
-    payment.status = PaymentStatusEnum.FAILED
+    if not await _set_status_unless_completed(session, payment, PaymentStatusEnum.FAILED):
+        logger.warning(f"Cannot fail completed payment {payment_id}")
+        raise PaymentAlreadyCompletedError(f"Payment {payment_id} is already completed")
     
     # Log failure event
     await log_payment_event(
@@ -1,45 +1,90 @@
 """Queue service for managing check processing order."""
 
+import asyncio
 import uuid
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import func, select, update
+from sqlalchemy import case, func, select, text, update
 
-from app.models.database import async_session_maker
+from app.models.database import NotifyListener, async_session_maker, engine
 from app.models.models import Check, CheckStatusEnum
 from app.utils.logger import logger
 
 
-async def add_to_queue(check_id: str) -> int:
+# Postgres channel used to wake up queue workers in other processes
+QUEUE_NOTIFY_CHANNEL = "check_queue"
+
+# Set when a check is enqueued (locally or via NOTIFY), awaited by the worker
+queue_event = asyncio.Event()
+
+
+async def add_to_queue(check_id: uuid.UUID) -> int:
     """Add a check to the processing queue.
     
     Args:
-        check_id: The check UUID string
+        check_id: The check UUID
         
     Returns:
         The queue position assigned to this check
     """
     async with async_session_maker() as session:
         # Get the current max queue position
-        result = await session.execute(
+        max_position = await session.scalar(
             select(func.max(Check.queue_position))
             .where(Check.status.in_([CheckStatusEnum.PENDING, CheckStatusEnum.PROCESSING]))
-        )
-        max_position = result.scalar() or 0
+        ) or 0
         new_position = max_position + 1
         
         # Update the check with queue position
         await session.execute(
             update(Check)
-            .where(Check.check_id == uuid.UUID(check_id))
+            .where(Check.check_id == check_id)
             .values(queue_position=new_position)
         )
+        
+        # Wake up workers in other processes (delivered on commit)
+        if session.bind.dialect.name == "postgresql":
+            await session.execute(text(f"NOTIFY {QUEUE_NOTIFY_CHANNEL}"))
+        
         await session.commit()
+        queue_event.set()
         
         logger.info(f"Check {check_id} added to queue at position {new_position}")
         return new_position
 
 
+async def start_queue_listener() -> NotifyListener | None:
+    """Subscribe to queue notifications from other processes.
+    
+    Listens on QUEUE_NOTIFY_CHANNEL over a dedicated, self-reconnecting
+    connection and sets queue_event for every NOTIFY. Only supported on
+    PostgreSQL; the worker's polling interval covers missed notifications.
+    
+    Returns:
+        The running listener (close it on shutdown), or None if unsupported
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    
+    listener = NotifyListener(QUEUE_NOTIFY_CHANNEL, lambda *args: queue_event.set())
+    listener.start()
+    return listener
+
+
+async def wait_for_queue(timeout: float) -> None:
+    """Wait until a check is enqueued or the timeout expires.
+    
+    Args:
+        timeout: Maximum seconds to wait (fallback polling interval)
+    """
+    try:
+        await asyncio.wait_for(queue_event.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        queue_event.clear()
+
+
 async def get_next_in_queue() -> Check | None:
     """Get the next check to process from the queue.
     
@@ -47,15 +92,16 @@ async def get_next_in_queue() -> Check | None:
         The next Check object to process, or None if queue is empty
     """
     async with async_session_maker() as session:
-        # Get the check with lowest queue position that is pending
-        result = await session.execute(
+        # Claim the pending check with lowest queue position; SKIP LOCKED lets
+        # several workers claim different checks without racing on the same row
+        check = await session.scalar(
             select(Check)
             .where(Check.status == CheckStatusEnum.PENDING)
             .where(Check.queue_position.isnot(None))
             .order_by(Check.queue_position.asc())
             .limit(1)
+            .with_for_update(skip_locked=True)
         )
-        check = result.scalar_one_or_none()
         
         if check:
             # Mark as processing
@@ -75,11 +121,10 @@ async def get_processing_count() -> int:
         Number of checks currently being processed
     """
     async with async_session_maker() as session:
-        result = await session.execute(
+        return await session.scalar(
             select(func.count(Check.check_id))
             .where(Check.status == CheckStatusEnum.PROCESSING)
-        )
-        return result.scalar() or 0
+        ) or 0
 
 
 async def get_pending_count() -> int:
@@ -89,52 +134,78 @@ async def get_pending_count() -> int:
         Number of checks waiting in queue
     """
     async with async_session_maker() as session:
-        result = await session.execute(
+        return await session.scalar(
             select(func.count(Check.check_id))
             .where(Check.status == CheckStatusEnum.PENDING)
+        ) or 0
+
+
+async def get_queue_counts() -> tuple[int, int]:
+    """Get pending and processing counts in a single query.
+    
+    Returns:
+        Tuple of (pending, processing) check counts
+    """
+    async with async_session_maker() as session:
+        result = await session.execute(
+            select(
+                func.count(case((Check.status == CheckStatusEnum.PENDING, 1))),
+                func.count(case((Check.status == CheckStatusEnum.PROCESSING, 1))),
+            )
+            .where(Check.status.in_([CheckStatusEnum.PENDING, CheckStatusEnum.PROCESSING]))
         )
-        return result.scalar() or 0
+        pending, processing = result.one()
+        return pending, processing
 
 
-async def get_queue_position(check_id: str) -> int | None:
+async def get_queue_position(check_id: uuid.UUID) -> int | None:
     """Get the current queue position for a check.
     
     Args:
-        check_id: The check UUID string
+        check_id: The check UUID
         
     Returns:
         Queue position or None if not in queue
     """
     async with async_session_maker() as session:
-        result = await session.execute(
+        return await session.scalar(
             select(Check.queue_position)
-            .where(Check.check_id == uuid.UUID(check_id))
+            .where(Check.check_id == check_id)
         )
-        return result.scalar_one_or_none()
 
 
 async def update_queue_positions() -> None:
     """Recalculate queue positions to fill gaps.
     
+    Positions are renumbered in a single UPDATE using ROW_NUMBER() over the
+    current order, so long queues are never loaded into Python.
+    
     This should be called periodically to maintain clean queue positions.
     """
     async with async_session_maker() as session:
-        # Get all pending checks ordered by current position
-        result = await session.execute(
-            select(Check)
+        # Rank pending checks by their current position
+        ranked = (
+            select(
+                Check.check_id,
+                func.row_number()
+                .over(order_by=Check.queue_position.asc())
+                .label("new_position"),
+            )
             .where(Check.status == CheckStatusEnum.PENDING)
             .where(Check.queue_position.isnot(None))
-            .order_by(Check.queue_position.asc())
+            .subquery()
         )
-        checks = result.scalars().all()
         
-        # Reassign positions sequentially
-        for i, check in enumerate(checks, start=1):
-            if check.queue_position != i:
-                check.queue_position = i
+        # Reassign positions sequentially, touching only rows that moved
+        result = await session.execute(
+            update(Check)
+            .where(Check.check_id == ranked.c.check_id)
+            .where(Check.queue_position != ranked.c.new_position)
+            .values(queue_position=ranked.c.new_position)
+        )
         
         await session.commit()
-        logger.debug(f"Queue positions updated for {len(checks)} checks")
+        logger.debug(f"Queue positions updated for {result.rowcount} checks")
 
 
 async def get_queue_status() -> dict:
@@ -143,8 +214,7 @@ async def get_queue_status() -> dict:
     Returns:
         Dictionary with queue statistics
     """
-    pending = await get_pending_count()
-    processing = await get_processing_count()
+    pending, processing = await get_queue_counts()
     
     # Estimate wait time (assuming ~2 min per check average)
     estimated_wait = (pending + processing) * 2
@@ -171,12 +241,11 @@ async def clear_stale_processing(timeout_minutes: int = 30) -> int:
     async with async_session_maker() as session:
         threshold = datetime.now(timezone.utc) - timedelta(minutes=timeout_minutes)
         
-        result = await session.execute(
+        stale_checks = (await session.scalars(
             select(Check)
             .where(Check.status == CheckStatusEnum.PROCESSING)
             .where(Check.started_at < threshold)
-        )
-        stale_checks = result.scalars().all()
+        )).all()
         
         for check in stale_checks:
             check.status = CheckStatusEnum.FAILED
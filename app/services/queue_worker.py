@@ -1,43 +1,63 @@
-"""Queue worker for processing checks sequentially."""
+"""Queue worker for processing checks with bounded concurrency."""
 
 import asyncio
-import sys
-from pathlib import Path
-
-# Add project root to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+import time
 
 from app.config import get_settings
 from app.services.check_service import process_check
 from app.services.queue_service import (
     clear_stale_processing,
     get_next_in_queue,
-    get_processing_count,
-    get_queue_status,
+    get_queue_counts,
+    start_queue_listener,
+    wait_for_queue,
 )
+from app.services.session_service import start_session_listener
 from app.utils.logger import logger
 
 settings = get_settings()
 
+# How often stale processing checks (e.g. left by a crashed worker) are swept
+STALE_CLEANUP_INTERVAL_SECONDS = 300
+
+
+async def _run_check(check, semaphore: asyncio.Semaphore) -> None:
+    """Process a claimed check and free its concurrency slot.
+    
+    Args:
+        check: The Check claimed from the queue
+        semaphore: Semaphore limiting concurrent checks
+    """
+    try:
+        await process_check(check.check_id)
+    except Exception as e:
+        logger.exception(f"Error processing check {check.check_id}: {e}")
+    finally:
+        semaphore.release()
+
 
 async def process_queue():
-    """Process checks from the queue one by one."""
+    """Process checks from the queue, up to max_concurrent_checks at a time."""
     logger.info("Queue worker started")
     
-    cleanup_counter = 0
+    semaphore = asyncio.Semaphore(settings.max_concurrent_checks)
+    running: set[asyncio.Task] = set()
+    next_cleanup_at = time.monotonic() + STALE_CLEANUP_INTERVAL_SECONDS
     
     while True:
+        # Wait for a free slot before claiming the next check
+        await semaphore.acquire()
+        started = False
         try:
             # Periodically clean up stale processing checks
-            cleanup_counter += 1
-            if cleanup_counter >= 60:  # Every ~5 minutes (60 * 5 sec interval)
+            if time.monotonic() >= next_cleanup_at:
                 stale_count = await clear_stale_processing(timeout_minutes=30)
                 if stale_count > 0:
                     logger.info(f"Cleaned up {stale_count} stale checks")
-                cleanup_counter = 0
+                next_cleanup_at = time.monotonic() + STALE_CLEANUP_INTERVAL_SECONDS
             
-            # Check if we're already at max concurrent checks
-            processing_count = await get_processing_count()
+            # Check queue state (one query for both counts)
+            pending_count, processing_count = await get_queue_counts()
             if processing_count >= settings.max_concurrent_checks:
                 logger.debug(
                     f"Max concurrent checks reached ({processing_count}/{settings.max_concurrent_checks}), "
@@ -47,32 +67,31 @@ async def process_queue():
                 continue
             
             # Get next check from queue
-            check = await get_next_in_queue()
+            check = await get_next_in_queue() if pending_count else None
             
             if check is None:
-                # No pending checks, wait
-                await asyncio.sleep(settings.queue_processing_interval)
+                # No pending checks, wait for a new one (or the fallback interval)
+                await wait_for_queue(settings.queue_processing_interval)
                 continue
             
             # Log queue status
-            status = await get_queue_status()
             logger.info(
                 f"Processing check {check.check_id} for @{check.target_username}. "
-                f"Queue: {status['total_pending']} pending, {status['total_processing']} processing"
+                f"Queue: {pending_count - 1} pending, {processing_count + 1} processing"
             )
             
-            # Process the check
-            try:
-                await process_check(str(check.check_id))
-            except Exception as e:
-                logger.exception(f"Error processing check {check.check_id}: {e}")
-            
-            # Small delay before next check
-            await asyncio.sleep(1)
+            # Process the check in the background; the task releases the slot
+            task = asyncio.create_task(_run_check(check, semaphore))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            started = True
             
         except Exception as e:
             logger.exception(f"Queue worker error: {e}")
             await asyncio.sleep(settings.queue_processing_interval)
+        finally:
+            if not started:
+                semaphore.release()
 
 
 async def main():
@@ -83,6 +102,18 @@ async def main():
     logger.info(f"Processing interval: {settings.queue_processing_interval}s")
     logger.info("=" * 50)
     
+    listener = None
+    try:
+        listener = await start_queue_listener()
+    except Exception as e:
+        logger.warning(f"Queue notifications unavailable, falling back to polling: {e}")
+    
+    session_listener = None
+    try:
+        session_listener = await start_session_listener()
+    except Exception as e:
+        logger.warning(f"Session notifications unavailable, relying on cache TTL: {e}")
+    
     try:
         await process_queue()
     except KeyboardInterrupt:
@@ -90,6 +121,11 @@ async def main():
     except Exception as e:
         logger.exception(f"Queue worker fatal error: {e}")
         raise
+    finally:
+        if listener is not None:
+            await listener.close()
+        if session_listener is not None:
+            await session_listener.close()
 
 
 if __name__ == "__main__":
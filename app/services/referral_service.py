@@ -1,6 +1,14 @@
 """Referral service for managing referral program."""
 
-from sqlalchemy import func, select
+import asyncio
+import time
+import uuid
+from collections.abc import Coroutine
+from datetime import datetime
+
+from sqlalchemy import case, exists, func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app.config import get_settings
 from app.models.database import async_session_maker
@@ -10,6 +18,40 @@ from app.utils.logger import logger
 
 settings = get_settings()
 
+# Settings read on every referral call, bound once at import
+_REQUIRED_COUNT = settings.referral_required_count
+_BONUS_CHECKS = settings.referral_bonus_checks
+_BOT_USERNAME = settings.bot_username or "your_bot"
+
+# Process-local cache of referral stats (read on every profile view,
+# changed only by new referrals and bonuses)
+_stats_cache: dict[int, tuple[float, dict]] = {}
+REFERRAL_STATS_CACHE_TTL_SECONDS = 30
+REFERRAL_STATS_CACHE_MAX_SIZE = 10_000
+
+# Strong references to fire-and-forget notification tasks (avoid early GC)
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _notify_in_background(coro: Coroutine) -> None:
+    """Send a Telegram notification without blocking the caller.
+    
+    Args:
+        coro: Notification coroutine to run
+    """
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def invalidate_referral_stats_cache(user_id: int) -> None:
+    """Drop cached referral stats for a user.
+    
+    Args:
+        user_id: The user ID whose stats changed
+    """
+    _stats_cache.pop(user_id, None)
+
 
 async def register_referral(referrer_code: str, referred_user_id: int) -> dict:
     """Register a new referral relationship.
@@ -22,26 +64,35 @@ async def register_referral(referrer_code: str, referred_user_id: int) -> dict:
         Dictionary with registration result
     """
     async with async_session_maker() as session:
-        # Find the referrer by their referral code
-        referrer_result = await session.execute(
-            select(User).where(User.referral_code == referrer_code)
+        # Find the referrer by their referral code, the referred user and
+        # whether they were already referred - all in one round trip
+        referred_alias = aliased(User)
+        lookup_result = await session.execute(
+            select(
+                User,
+                referred_alias,
+                exists()
+                .where(Referral.referred_user_id == referred_user_id)
+                .label("already_referred"),
+            )
+            .outerjoin(referred_alias, referred_alias.user_id == referred_user_id)
+            .where(User.referral_code == referrer_code)
         )
-        referrer = referrer_result.scalar_one_or_none()
+        row = lookup_result.one_or_none()
         
-        if not referrer:
+        if not row:
             logger.warning(f"Referrer not found for code: {referrer_code}")
             return {"success": False, "message": "Referrer not found"}
         
+        referrer, referred_user, already_referred = row
+        
         # Can't refer yourself
         if referrer.user_id == referred_user_id:
             logger.warning(f"User {referred_user_id} tried to refer themselves")
             return {"success": False, "message": "Cannot refer yourself"}
         
         # Check if this user was already referred
-        existing_referral = await session.execute(
-            select(Referral).where(Referral.referred_user_id == referred_user_id)
-        )
-        if existing_referral.scalar_one_or_none():
+        if already_referred:
             logger.info(f"User {referred_user_id} was already referred")
             return {"success": False, "message": "User already has a referrer"}
         
@@ -54,28 +105,30 @@ async def register_referral(referrer_code: str, referred_user_id: int) -> dict:
         session.add(referral)
         
         # Update the referred user's referrer_id
-        referred_result = await session.execute(
-            select(User).where(User.user_id == referred_user_id)
-        )
-        referred_user = referred_result.scalar_one_or_none()
+        referred_username = None
         if referred_user:
             referred_user.referrer_id = referrer.user_id
+            referred_username = referred_user.username
+        
+        await session.flush()
+        
+        # Check if referrer should receive a bonus (same transaction)
+        bonus_checks = await _grant_bonus_if_due(session, referrer.user_id)
         
         await session.commit()
+        invalidate_referral_stats_cache(referrer.user_id)
         
         logger.info(
             f"Referral registered: {referrer.user_id} -> {referred_user_id} "
             f"(code: {referrer_code})"
         )
         
-        # Notify referrer about new referral
-        await notify_new_referral(
-            referrer.user_id, 
-            referred_user.username if referred_user else None
-        )
+        # Notify referrer about new referral and bonus (off the registration path)
+        _notify_in_background(notify_new_referral(referrer.user_id, referred_username))
+        if bonus_checks:
+            _notify_in_background(notify_referral_bonus(referrer.user_id, bonus_checks))
         
-        # Check if referrer should receive a bonus
-        bonus_granted = await check_and_grant_bonus(referrer.user_id)
+        bonus_granted = bool(bonus_checks)
         
         return {
             "success": True,
@@ -84,73 +137,69 @@ async def register_referral(referrer_code: str, referred_user_id: int) -> dict:
         }
 
 
-async def check_and_grant_bonus(referrer_user_id: int) -> bool:
-    """Check if referrer has earned a bonus and grant it.
+async def _grant_bonus_if_due(session: AsyncSession, referrer_user_id: int) -> int:
+    """Grant a referral bonus within the caller's transaction if one is due.
     
-    Grants one free check for every REFERRAL_REQUIRED_COUNT referrals.
+    Does not commit; the caller commits and sends notifications.
     
     Args:
+        session: Database session
         referrer_user_id: The user ID of the referrer
         
     Returns:
-        True if bonus was granted, False otherwise
+        Number of bonus checks granted (0 if no bonus was due)
     """
-    async with async_session_maker() as session:
-        # Count total referrals for this user
-        total_result = await session.execute(
-            select(func.count(Referral.referral_id))
-            .where(Referral.referrer_user_id == referrer_user_id)
+    # Count total referrals and those that already granted bonuses in one query
+    counts_result = await session.execute(
+        select(
+            func.count(Referral.referral_id),
+            func.coalesce(
+                func.sum(case((Referral.bonus_granted, 1), else_=0)), 0
+            ),
         )
-        total_referrals = total_result.scalar() or 0
-        
-        # Count referrals that already granted bonuses
-        bonus_granted_result = await session.execute(
-            select(func.count(Referral.referral_id))
-            .where(Referral.referrer_user_id == referrer_user_id)
-            .where(Referral.bonus_granted == True)
-        )
-        bonus_granted_count = bonus_granted_result.scalar() or 0
-        
-        # Calculate how many bonuses should have been granted
-        required_count = settings.referral_required_count
-        expected_bonuses = total_referrals // required_count
-        
-        if expected_bonuses > bonus_granted_count:
-            # Grant bonus
-            user_result = await session.execute(
-                select(User).where(User.user_id == referrer_user_id)
+        .where(Referral.referrer_user_id == referrer_user_id)
+    )
+    total_referrals, bonus_granted_count = counts_result.one()
+    
+    # Calculate how many bonuses should have been granted
+    required_count = _REQUIRED_COUNT
+    expected_bonuses = total_referrals // required_count
+    
+    if expected_bonuses <= bonus_granted_count:
+        return 0
+    
+    # Grant bonus
+    bonus_checks = _BONUS_CHECKS
+    user_result = await session.execute(
+        update(User)
+        .where(User.user_id == referrer_user_id)
+        .values(checks_balance=User.checks_balance + bonus_checks)
+    )
+    
+    if not user_result.rowcount:
+        return 0
+    
+    # Mark the oldest referrals that haven't granted bonus yet
+    await session.execute(
+        update(Referral)
+        .where(
+            Referral.referral_id.in_(
+                select(Referral.referral_id)
+                .where(Referral.referrer_user_id == referrer_user_id)
+                .where(~Referral.bonus_granted)
+                .order_by(Referral.created_at.asc())
+                .limit(required_count)
             )
-            user = user_result.scalar_one_or_none()
-            
-            if user:
-                bonus_checks = settings.referral_bonus_checks
-                user.checks_balance += bonus_checks
-                
-                # Mark the required number of referrals as bonus_granted
-                # Get the oldest referrals that haven't granted bonus yet
-                referrals_to_mark = await session.execute(
-                    select(Referral)
-                    .where(Referral.referrer_user_id == referrer_user_id)
-                    .where(Referral.bonus_granted == False)
-                    .order_by(Referral.created_at.asc())
-                    .limit(required_count)
-                )
-                for ref in referrals_to_mark.scalars().all():
-                    ref.bonus_granted = True
-                
-                await session.commit()
-                
-                logger.info(
-                    f"Granted {bonus_checks} bonus checks to user {referrer_user_id} "
-                    f"for reaching {total_referrals} referrals"
-                )
-                
-                # Notify user about the bonus
-                await notify_referral_bonus(referrer_user_id, bonus_checks)
-                
-                return True
-        
-        return False
+        )
+        .values(bonus_granted=True)
+    )
+    
+    logger.info(
+        f"Granted {bonus_checks} bonus checks to user {referrer_user_id} "
+        f"for reaching {total_referrals} referrals"
+    )
+    
+    return bonus_checks
 
 
 async def get_referral_stats(user_id: int) -> dict:
@@ -162,46 +211,39 @@ async def get_referral_stats(user_id: int) -> dict:
     Returns:
         Dictionary with referral statistics
     """
+    cached = _stats_cache.get(user_id)
+    if cached and time.monotonic() - cached[0] < REFERRAL_STATS_CACHE_TTL_SECONDS:
+        return dict(cached[1])
+    
     async with async_session_maker() as session:
         # Get user
-        user_result = await session.execute(
+        user = await session.scalar(
             select(User).where(User.user_id == user_id)
         )
-        user = user_result.scalar_one_or_none()
         
         if not user:
             logger.warning(f"User {user_id} not found in get_referral_stats")
             return None
         
-        logger.info(f"Getting referral stats for user {user_id}, referral_code: {user.referral_code}")
+        logger.debug(
+            "Getting referral stats for user %s, referral_code: %s", user_id, user.referral_code
+        )
         
         # Count total referrals
-        total_result = await session.execute(
+        total_referrals = await session.scalar(
             select(func.count(Referral.referral_id))
             .where(Referral.referrer_user_id == user_id)
-        )
-        total_referrals = total_result.scalar() or 0
-        
-        # Also check raw count for debugging
-        raw_count_result = await session.execute(
-            select(Referral).where(Referral.referrer_user_id == user_id)
-        )
-        raw_referrals = raw_count_result.scalars().all()
-        logger.info(
-            f"User {user_id} referral count: total_referrals={total_referrals}, "
-            f"raw_count={len(raw_referrals)}, referral_ids={[r.referral_id for r in raw_referrals]}"
-        )
+        ) or 0
         
         # Calculate progress
-        required_count = settings.referral_required_count
+        required_count = _REQUIRED_COUNT
         bonus_progress = total_referrals % required_count
         referrals_for_bonus = required_count - bonus_progress
         total_bonuses = total_referrals // required_count
         
         # Generate referral link
-        bot_username = settings.bot_username or "your_bot"
         referral_code = user.referral_code or f"ref_{user_id}"
-        referral_link = f"https://t.me/{bot_username}?start={referral_code}"
+        referral_link = f"https://t.me/{_BOT_USERNAME}?start={referral_code}"
         
         result = {
             "user_id": user_id,
@@ -213,51 +255,89 @@ async def get_referral_stats(user_id: int) -> dict:
             "total_bonuses_earned": total_bonuses,
         }
         
-        logger.info(f"Returning referral stats for user {user_id}: {result}")
+        logger.debug("Returning referral stats for user %s: %s", user_id, result)
         
-        return result
+        if len(_stats_cache) >= REFERRAL_STATS_CACHE_MAX_SIZE:
+            _stats_cache.clear()
+        _stats_cache[user_id] = (time.monotonic(), result)
+        
+        return dict(result)
 
 
-async def get_referral_list(user_id: int, limit: int = 20, offset: int = 0) -> dict:
+async def get_referral_list(
+    user_id: int,
+    limit: int = 20,
+    offset: int = 0,
+    after: tuple[datetime, uuid.UUID] | None = None,
+) -> dict:
     """Get list of referrals made by a user.
     
+    Pages are ordered newest first. Passing the previous page's
+    ``next_cursor`` as ``after`` seeks straight to the next page instead of
+    skipping ``offset`` rows.
+    
     Args:
         user_id: The user ID to get referrals for
         limit: Maximum number of referrals to return
-        offset: Number of referrals to skip
+        offset: Number of referrals to skip (ignored when after is set)
+        after: (created_at, referral_id) of the last referral already seen
         
     Returns:
-        Dictionary with referral list
+        Dictionary with referral list, total and next page cursor
     """
     async with async_session_maker() as session:
-        # Get referrals with referred user info
-        result = await session.execute(
-            select(Referral, User)
-            .join(User, Referral.referred_user_id == User.user_id)
+        total_query = (
+            select(func.count(Referral.referral_id))
             .where(Referral.referrer_user_id == user_id)
-            .order_by(Referral.created_at.desc())
-            .limit(limit)
-            .offset(offset)
         )
-        referrals = result.all()
         
-        # Count total
-        count_result = await session.execute(
-            select(func.count(Referral.referral_id))
+        # Get referrals, referred usernames and the total in one query (one
+        # extra row tells whether there is a next page). Outer join: a referral
+        # whose user row is gone is still listed (and counted in the total)
+        query = (
+            select(Referral, User.username, total_query.scalar_subquery().label("total"))
+            .outerjoin(User, Referral.referred_user_id == User.user_id)
             .where(Referral.referrer_user_id == user_id)
+            .order_by(Referral.created_at.desc(), Referral.referral_id.desc())
+            .limit(limit + 1)
         )
-        total = count_result.scalar() or 0
+        if after is not None:
+            query = query.where(
+                tuple_(Referral.created_at, Referral.referral_id) < tuple(after)
+            )
+        elif offset:
+            query = query.offset(offset)
+        
+        result = await session.execute(query)
+        referrals = result.all()
+        
+        # Read the total before the look-ahead row is trimmed off
+        if referrals:
+            total = referrals[0].total
+        elif offset or after is not None:
+            # Page past the end - no row to carry the total
+            total = await session.scalar(total_query) or 0
+        else:
+            total = 0
+        
+        next_cursor = None
+        if len(referrals) > limit:
+            referrals = referrals[:limit]
+            # limit=0 gives an empty page with no row to continue from
+            if referrals:
+                last = referrals[-1].Referral
+                next_cursor = (last.created_at, last.referral_id)
         
         return {
             "referrals": [
                 {
                     "referred_user_id": ref.referred_user_id,
-                    "referred_username": user.username,
+                    "referred_username": username,
                     "created_at": ref.created_at,
                     "bonus_granted": ref.bonus_granted,
                 }
-                for ref, user in referrals
+                for ref, username, _ in referrals
             ],
             "total": total,
+            "next_cursor": next_cursor,
         }
-
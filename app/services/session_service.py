@@ -4,47 +4,184 @@ Handles persistent storage of Instagram session IDs in the database,
 validation of session tokens, and fallback logic.
 """
 
+import asyncio
+import hashlib
+import time
 from datetime import datetime, timezone
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 
 import httpx
-from sqlalchemy import select, update
+import orjson
+from sqlalchemy import Insert, Update, case, func, insert, select, text, update
 
-from app.models.database import async_session_maker
+from app.models.database import NotifyListener, async_session_maker, engine
 from app.models.models import InstagramSession
 from app.utils.logger import logger
 
 
 # Cache for sync access (updated by async functions)
 _cached_session_id: str | None = None
-_cache_timestamp: datetime | None = None
+_cache_expires_at: float = 0.0  # time.monotonic() deadline
 CACHE_TTL_SECONDS = 60  # Refresh cache every minute
 
+# First 8 chars + "..." (or "***" for short IDs), computed by the database
+_MASKED_SESSION_ID = case(
+    (
+        func.length(InstagramSession.session_id) > 8,
+        func.substr(InstagramSession.session_id, 1, 8) + "...",
+    ),
+    else_="***",
+)
+
+# In-flight active-session lookup shared by concurrent callers (single-flight)
+_active_session_lookup: asyncio.Task | None = None
+
+# Repeated invalidations of the same session within this window skip the DB
+INVALIDATE_DEBOUNCE_SECONDS = 5.0
+_last_invalidated: tuple[str | None, float] = (None, 0.0)  # (session_id, monotonic time)
+
+# Postgres channel used to drop cached session IDs in other processes
+SESSION_NOTIFY_CHANNEL = "instagram_session_changed"
+
+# Session validation request (official Instagram account always exists)
+_VALIDATE_URL = "https://www.instagram.com/api/v1/users/web_profile_info/"
+_VALIDATE_PARAMS = {"username": "instagram"}
+_VALIDATE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "*/*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "X-IG-App-ID": "936619743392459",
+    "X-Requested-With": "XMLHttpRequest",
+    "Referer": "https://www.instagram.com/",
+    "Origin": "https://www.instagram.com",
+}
+
+# Recent validation results keyed by _validation_key(session_id), never the
+# plaintext secret: (monotonic time, is_valid, message)
+VALIDATION_CACHE_TTL_SECONDS = 45
+VALIDATION_TIMEOUT_SECONDS = 15  # Bounds HEAD probe + GET together
+_validation_cache: dict[str, tuple[float, bool, str]] = {}
+# One lock per session ID: concurrent checks of the same ID share a request,
+# checks of different IDs don't wait for each other
+_validation_locks: dict[str, asyncio.Lock] = {}
+
+# Shared HTTP client for session validation (keeps connections to Instagram alive)
+_http_client: httpx.AsyncClient | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared HTTP client for session validation."""
+    global _http_client
+    
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers=_VALIDATE_HEADERS,
+            http2=True,
+            # Fail fast on connect, leave the read phase its own budget
+            timeout=httpx.Timeout(connect=3.0, read=10.0, write=3.0, pool=1.0),
+            follow_redirects=True,
+            # Never store response cookies - each validation sends only its own session ID
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=20,
+                keepalive_expiry=30,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (call on shutdown)."""
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+
+
+def _invalidate_session_cache(*args) -> None:
+    """Drop the cached session ID (NOTIFY callback)."""
+    global _cached_session_id, _cache_expires_at
+    
+    _cached_session_id = None
+    _cache_expires_at = 0.0
+
+
+async def start_session_listener() -> NotifyListener | None:
+    """Subscribe to session changes made by other processes.
+    
+    Listens on SESSION_NOTIFY_CHANNEL over a dedicated, self-reconnecting
+    connection and drops the cached session ID for every NOTIFY. Only
+    supported on PostgreSQL; CACHE_TTL_SECONDS still bounds staleness when
+    notifications are missed.
+    
+    Returns:
+        The running listener (close it on shutdown), or None if unsupported
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    
+    listener = NotifyListener(SESSION_NOTIFY_CHANNEL, _invalidate_session_cache)
+    listener.start()
+    return listener
+
+
+async def _notify_session_changed(session) -> None:
+    """Queue a NOTIFY for other processes (delivered on commit)."""
+    if session.bind.dialect.name == "postgresql":
+        await session.execute(text(f"NOTIFY {SESSION_NOTIFY_CHANNEL}"))
+
 
 async def get_active_session_id() -> str | None:
     """Get the currently active session ID from the database.
     
+    Concurrent callers share a single in-flight query.
+    
     Returns:
         The active session ID or None if not found.
     """
-    global _cached_session_id, _cache_timestamp
+    # Shielded so one cancelled caller doesn't cancel the lookup for the rest
+    return await asyncio.shield(_start_active_session_lookup())
+
+
+def _start_active_session_lookup() -> asyncio.Task:
+    """Return the in-flight active-session lookup, starting one if needed."""
+    global _active_session_lookup
+    
+    if _active_session_lookup is None:
+        _active_session_lookup = asyncio.create_task(_load_active_session_id())
+        _active_session_lookup.add_done_callback(_clear_active_session_lookup)
+    return _active_session_lookup
+
+
+def _clear_active_session_lookup(task: asyncio.Task) -> None:
+    """Let the next caller start a fresh lookup."""
+    global _active_session_lookup
+    
+    if _active_session_lookup is task:
+        _active_session_lookup = None
+    
+    # Background refreshes have no awaiting caller to report a failure to
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Active session lookup failed: {task.exception()}")
+
+
+async def _load_active_session_id() -> str | None:
+    """Query the active session ID and update the cache."""
+    global _cached_session_id, _cache_expires_at
     
     async with async_session_maker() as session:
-        result = await session.execute(
-            select(InstagramSession)
+        # Only the session_id column is needed - skip loading the full row
+        session_id = await session.scalar(
+            select(InstagramSession.session_id)
             .where(InstagramSession.is_active == True)
             .where(InstagramSession.is_valid == True)
             .order_by(InstagramSession.created_at.desc())
             .limit(1)
         )
-        ig_session = result.scalar_one_or_none()
         
-        if ig_session:
-            # Update cache
-            _cached_session_id = ig_session.session_id
-            _cache_timestamp = datetime.now(timezone.utc)
-            return ig_session.session_id
-        
-        return None
+        # Update cache (cleared when no valid session is left)
+        _cached_session_id = session_id
+        _cache_expires_at = time.monotonic() + CACHE_TTL_SECONDS
+        return session_id
 
 
 def get_active_session_id_sync() -> str | None:
@@ -56,17 +193,66 @@ def get_active_session_id_sync() -> str | None:
     Returns:
         Cached session ID or None.
     """
-    global _cached_session_id, _cache_timestamp
+    global _cached_session_id, _cache_expires_at
     
     # Check if cache is still valid
-    if _cached_session_id and _cache_timestamp:
-        age = (datetime.now(timezone.utc) - _cache_timestamp).total_seconds()
-        if age < CACHE_TTL_SECONDS:
-            return _cached_session_id
+    if time.monotonic() < _cache_expires_at:
+        return _cached_session_id
+    
+    # Stale: refresh in the background (at most once per TTL), so staleness
+    # stays bounded by the TTL even when change notifications are missed
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass  # No event loop (sync caller) - nothing to schedule on
+    else:
+        _cache_expires_at = time.monotonic() + CACHE_TTL_SECONDS
+        _start_active_session_lookup()
     
     return _cached_session_id  # Return even stale cache, async will refresh
 
 
+def _session_rotation_statements(
+    dialect_name: str, session_id: str, notes: str | None
+) -> tuple[Update | None, Insert]:
+    """Build the statements that replace the active session with a new one.
+    
+    On PostgreSQL the deactivation runs inside the INSERT as a data-modifying
+    CTE, so only the INSERT is returned. Other dialects (SQLite has no DML in
+    CTEs) get the UPDATE separately, to run first.
+    
+    Args:
+        dialect_name: Name of the database dialect.
+        session_id: The Instagram session ID to save.
+        notes: Optional notes about this session.
+        
+    Returns:
+        Tuple of (deactivating UPDATE or None, INSERT returning the new record).
+    """
+    deactivate = (
+        update(InstagramSession)
+        .where(InstagramSession.is_active == True)
+        .values(is_active=False)
+    )
+    create = (
+        insert(InstagramSession)
+        .values(
+            session_id=session_id,
+            is_active=True,
+            is_valid=True,
+            notes=notes,
+            last_verified_at=datetime.now(timezone.utc),
+        )
+        .returning(InstagramSession)
+    )
+    
+    if dialect_name == "postgresql":
+        return None, create.add_cte(
+            deactivate.returning(InstagramSession.id).cte("deactivated")
+        )
+    return deactivate, create
+
+
 async def save_session_id(session_id: str, notes: str | None = None) -> InstagramSession:
     """Save a new session ID to the database.
     
@@ -79,41 +265,91 @@ async def save_session_id(session_id: str, notes: str | None = None) -> Instagra
     Returns:
         The created InstagramSession record.
     """
-    global _cached_session_id, _cache_timestamp
+    global _cached_session_id, _cache_expires_at, _last_invalidated
     
     async with async_session_maker() as session:
-        # Deactivate all existing sessions
-        await session.execute(
-            update(InstagramSession)
-            .where(InstagramSession.is_active == True)
-            .values(is_active=False)
-        )
-        
-        # Create new session
-        new_session = InstagramSession(
-            session_id=session_id,
-            is_active=True,
-            is_valid=True,
-            notes=notes,
-            last_verified_at=datetime.now(timezone.utc),
+        deactivate, create = _session_rotation_statements(
+            session.bind.dialect.name, session_id, notes
         )
-        session.add(new_session)
+        if deactivate is not None:
+            await session.execute(deactivate)
+        new_session = await session.scalar(create)
+        await _notify_session_changed(session)
         await session.commit()
-        await session.refresh(new_session)
         
-        # Update cache
+        # Update cache; the new session must not inherit the invalidation debounce
+        key = _validation_key(session_id)
+        _validation_cache.pop(key, None)
+        _validation_locks.pop(key, None)
+        _last_invalidated = (None, 0.0)
         _cached_session_id = session_id
-        _cache_timestamp = datetime.now(timezone.utc)
+        _cache_expires_at = time.monotonic() + CACHE_TTL_SECONDS
         
         logger.info(f"Saved new Instagram session (ID: {new_session.id})")
         return new_session
 
 
+def _validation_key(session_id: str) -> str:
+    """Key for the validation cache and locks (a hash, not the secret itself)."""
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+def _evict_expired_validations(keep: str) -> None:
+    """Drop expired validation results and the idle locks left behind.
+    
+    Args:
+        keep: Key whose expired result is still wanted as a timeout fallback.
+    """
+    now = time.monotonic()
+    for key, (checked_at, _, _) in list(_validation_cache.items()):
+        if key != keep and now - checked_at >= VALIDATION_CACHE_TTL_SECONDS:
+            del _validation_cache[key]
+    
+    for key, lock in list(_validation_locks.items()):
+        if key != keep and key not in _validation_cache and not lock.locked():
+            del _validation_locks[key]
+
+
 async def validate_session_id(session_id: str) -> tuple[bool, str]:
     """Validate an Instagram session ID by making a test API request.
     
-    Makes a request to Instagram's web profile API to check if the session
-    is valid and authenticated.
+    Results are reused for VALIDATION_CACHE_TTL_SECONDS, and concurrent
+    callers wait for a single request instead of each probing Instagram.
+    A check taking longer than VALIDATION_TIMEOUT_SECONDS is abandoned in
+    favour of the last known result.
+    
+    Args:
+        session_id: The session ID to validate.
+        
+    Returns:
+        Tuple of (is_valid, message).
+    """
+    key = _validation_key(session_id)
+    _evict_expired_validations(keep=key)
+    
+    if (lock := _validation_locks.get(key)) is None:
+        lock = _validation_locks[key] = asyncio.Lock()
+    async with lock:
+        cached = _validation_cache.get(key)
+        if cached and time.monotonic() - cached[0] < VALIDATION_CACHE_TTL_SECONDS:
+            return cached[1], cached[2]
+        
+        try:
+            async with asyncio.timeout(VALIDATION_TIMEOUT_SECONDS):
+                is_valid, message = await _probe_session_id(session_id)
+        except (TimeoutError, httpx.TimeoutException):
+            logger.error("Session validation: timeout")
+            if cached:
+                return cached[1], cached[2]
+            # Timeout doesn't mean invalid - save anyway, but don't cache it
+            return True, "Validation timed out, but session saved"
+        
+        _validation_cache[key] = (time.monotonic(), is_valid, message)
+        return is_valid, message
+
+
+async def _probe_session_id(session_id: str) -> tuple[bool, str]:
+    """Check a session ID against Instagram's web profile API.
     
     Args:
         session_id: The session ID to validate.
@@ -121,85 +357,88 @@ async def validate_session_id(session_id: str) -> tuple[bool, str]:
     Returns:
         Tuple of (is_valid, message).
     """
-    test_url = "https://www.instagram.com/api/v1/users/web_profile_info/"
-    params = {"username": "instagram"}  # Official Instagram account (always exists)
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "*/*",
-        "Accept-Language": "en-US,en;q=0.9",
-        "X-IG-App-ID": "936619743392459",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": "https://www.instagram.com/",
-        "Origin": "https://www.instagram.com",
-    }
-    
-    cookies = {
-        "sessionid": session_id,
-    }
+    # Sent as a header: the shared client keeps no cookie jar of its own
+    headers = {"Cookie": f"sessionid={session_id}"}
     
+    client = _get_http_client()
+    
+    # Cheap probe first: an expired session is redirected to the login page,
+    # which HEAD reveals without downloading the profile JSON
     try:
-        # Follow redirects to handle 302 responses
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            response = await client.get(
-                test_url,
-                params=params,
-                headers=headers,
-                cookies=cookies,
-            )
-            
-            # Check final URL after redirects
-            final_url = str(response.url)
-            
-            # If redirected to login page - session is invalid
-            if "login" in final_url.lower() or "accounts/login" in final_url:
-                logger.warning("Session validation: redirected to login page - session invalid")
-                return False, "Session expired (redirected to login)"
-            
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    user = data.get("data", {}).get("user")
-                    if user and user.get("username") == "instagram":
-                        logger.info("Session ID validation successful")
-                        return True, "Session is valid and authenticated"
-                    elif user:
-                        # Got some user data - session likely works
-                        logger.info("Session validation: got user data, session valid")
-                        return True, "Session is valid"
-                    else:
-                        # No user data but 200 OK - might still work
-                        logger.warning("Session validation: 200 OK but unexpected structure")
-                        return True, "Session appears valid (200 OK)"
-                except Exception as e:
-                    # JSON parsing failed but 200 - might still work
-                    logger.warning(f"Session validation: JSON error but 200 status: {e}")
+        probe = await client.head(
+            _VALIDATE_URL,
+            params=_VALIDATE_PARAMS,
+            headers=headers,
+            follow_redirects=False,
+        )
+        if probe.is_redirect and "login" in probe.headers.get("location", "").lower():
+            logger.warning("Session validation: redirected to login page - session invalid")
+            return False, "Session expired (redirected to login)"
+    except httpx.HTTPError as e:
+        # Inconclusive - fall through to the full GET
+        logger.debug(f"Session validation: HEAD probe failed: {e}")
+    
+    try:
+        # Shared client follows redirects to handle 302 responses
+        response = await client.get(
+            _VALIDATE_URL,
+            params=_VALIDATE_PARAMS,
+            headers=headers,
+        )
+        
+        logger.debug(f"Session validation: {response.http_version} {response.status_code}")
+        
+        # Check final URL after redirects
+        final_url = str(response.url)
+        
+        # If redirected to login page - session is invalid
+        if "login" in final_url.lower() or "accounts/login" in final_url:
+            logger.warning("Session validation: redirected to login page - session invalid")
+            return False, "Session expired (redirected to login)"
+        
+        if response.status_code == 200:
+            try:
+                data = orjson.loads(response.content)
+                user = data.get("data", {}).get("user")
+                if user and user.get("username") == "instagram":
+                    logger.info("Session ID validation successful")
+                    return True, "Session is valid and authenticated"
+                elif user:
+                    # Got some user data - session likely works
+                    logger.info("Session validation: got user data, session valid")
+                    return True, "Session is valid"
+                else:
+                    # No user data but 200 OK - might still work
+                    logger.warning("Session validation: 200 OK but unexpected structure")
                     return True, "Session appears valid (200 OK)"
-                    
-            elif response.status_code == 401:
-                logger.warning("Session ID validation failed: unauthorized")
-                return False, "Session expired or invalid (401 Unauthorized)"
+            except Exception as e:
+                # JSON parsing failed but 200 - might still work
+                logger.warning(f"Session validation: JSON error but 200 status: {e}")
+                return True, "Session appears valid (200 OK)"
                 
-            elif response.status_code == 429:
-                logger.warning("Session validation: rate limited")
-                # Don't reject the token just because of rate limiting
-                return True, "Rate limited, but session may be valid"
+        elif response.status_code == 401:
+            logger.warning("Session ID validation failed: unauthorized")
+            return False, "Session expired or invalid (401 Unauthorized)"
+            
+        elif response.status_code == 429:
+            logger.warning("Session validation: rate limited")
+            # Don't reject the token just because of rate limiting
+            return True, "Rate limited, but session may be valid"
+        
+        elif response.status_code in (301, 302, 303, 307, 308):
+            # Redirect not followed (shouldn't happen with follow_redirects=True)
+            # But if we're here, treat non-login redirects as potentially valid
+            logger.warning(f"Session validation: redirect {response.status_code}")
+            return True, "Session may be valid (redirect response)"
+            
+        else:
+            logger.warning(f"Session validation: unexpected status {response.status_code}")
+            # Don't immediately reject - session might still work
+            return True, f"Session saved (status {response.status_code}, will test on first check)"
             
-            elif response.status_code in (301, 302, 303, 307, 308):
-                # Redirect not followed (shouldn't happen with follow_redirects=True)
-                # But if we're here, treat non-login redirects as potentially valid
-                logger.warning(f"Session validation: redirect {response.status_code}")
-                return True, "Session may be valid (redirect response)"
-                
-            else:
-                logger.warning(f"Session validation: unexpected status {response.status_code}")
-                # Don't immediately reject - session might still work
-                return True, f"Session saved (status {response.status_code}, will test on first check)"
-                
     except httpx.TimeoutException:
-        logger.error("Session validation: timeout")
-        # Timeout doesn't mean invalid - save anyway
-        return True, "Validation timed out, but session saved"
+        # Reported by validate_session_id, which must not cache it
+        raise
     except Exception as e:
         logger.error(f"Session validation error: {e}")
         # Save anyway and let it fail on actual use if invalid
@@ -215,26 +454,46 @@ async def mark_session_invalid(session_id: str | None = None) -> bool:
     Returns:
         True if a session was marked invalid, False otherwise.
     """
-    global _cached_session_id
+    global _cached_session_id, _cache_expires_at, _last_invalidated
+    
+    # Collapse a burst of failures for the same session into one UPDATE
+    last_session_id, last_at = _last_invalidated
+    if last_session_id == session_id and time.monotonic() - last_at < INVALIDATE_DEBOUNCE_SECONDS:
+        return False
     
     async with async_session_maker() as session:
+        # Only rows still marked valid are touched, so repeats are no-ops
         if session_id:
             result = await session.execute(
                 update(InstagramSession)
                 .where(InstagramSession.session_id == session_id)
+                .where(InstagramSession.is_valid == True)
                 .values(is_valid=False)
             )
         else:
             result = await session.execute(
                 update(InstagramSession)
                 .where(InstagramSession.is_active == True)
+                .where(InstagramSession.is_valid == True)
                 .values(is_valid=False)
             )
         
+        if result.rowcount > 0:
+            await _notify_session_changed(session)
         await session.commit()
+        _last_invalidated = (session_id, time.monotonic())
+        
+        if session_id:
+            key = _validation_key(session_id)
+            _validation_cache.pop(key, None)
+            _validation_locks.pop(key, None)
+        else:
+            _validation_cache.clear()
+            _validation_locks.clear()
         
         if result.rowcount > 0:
             _cached_session_id = None  # Clear cache
+            _cache_expires_at = 0.0
             logger.warning(f"Marked session(s) as invalid (count: {result.rowcount})")
             return True
         
@@ -297,30 +556,44 @@ async def get_all_sessions() -> list[dict]:
         List of session info dicts.
     """
     async with async_session_maker() as session:
+        # Mask in SQL so full session IDs never leave the database
         result = await session.execute(
-            select(InstagramSession)
+            select(
+                InstagramSession.id,
+                _MASKED_SESSION_ID.label("session_id_masked"),
+                InstagramSession.is_active,
+                InstagramSession.is_valid,
+                InstagramSession.created_at,
+                InstagramSession.notes,
+            )
             .order_by(InstagramSession.created_at.desc())
             .limit(10)  # Last 10 sessions
         )
-        sessions = result.scalars().all()
         
         return [
             {
-                "id": s.id,
-                "session_id_masked": s.session_id[:8] + "..." if len(s.session_id) > 8 else "***",
-                "is_active": s.is_active,
-                "is_valid": s.is_valid,
-                "created_at": s.created_at.isoformat() if s.created_at else None,
-                "notes": s.notes,
+                "id": row.id,
+                "session_id_masked": row.session_id_masked,
+                "is_active": row.is_active,
+                "is_valid": row.is_valid,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "notes": row.notes,
             }
-            for s in sessions
+            for row in result
         ]
 
 
-async def refresh_session_cache() -> None:
+async def refresh_session_cache(force: bool = False) -> None:
     """Refresh the session cache from database.
     
     Call this periodically or after database changes.
+    
+    Args:
+        force: Query the database even if the cache is still fresh.
     """
+    # Warm cache with some TTL left - nothing to do
+    if not force and _cached_session_id and time.monotonic() < _cache_expires_at - 5:
+        return
+    
     await get_active_session_id()
 
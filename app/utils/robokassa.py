@@ -1,12 +1,36 @@
 """Robokassa payment integration utilities."""
 
+import binascii
 import hashlib
+import hmac
 from decimal import Decimal
-from urllib.parse import urlencode
+from urllib.parse import quote_plus
 
 from app.utils.logger import logger
 
 
+# Shp_* parameters sent with every payment, in the alphabetical order
+# Robokassa requires for the signature
+_SHP_KEYS = ("Shp_payment_id", "Shp_tariff_id", "Shp_user_id")
+
+# Payment page URL; only merchant login and description need escaping, the
+# other values are digits, hex signatures and UUIDs
+_PAY_URL_TEMPLATE = (
+    "https://auth.robokassa.ru/Merchant/Index.aspx"
+    "?MerchantLogin=%s&OutSum=%s&InvId=%s&Description=%s&SignatureValue=%s"
+    "&Culture=ru&Encoding=utf-8"
+    f"&{_SHP_KEYS[0]}=%s&{_SHP_KEYS[1]}=%s&{_SHP_KEYS[2]}=%s"
+)
+
+
+def _signature(signature_str: str) -> str:
+    """Compute the uppercase MD5 hex signature Robokassa expects."""
+    # MD5 is mandated by the Robokassa protocol, not chosen for security
+    # Uppercase the hex as bytes - cheaper than str.upper()
+    digest = hashlib.md5(signature_str.encode(), usedforsecurity=False).digest()
+    return binascii.hexlify(digest).upper().decode("ascii")
+
+
 def generate_payment_url(
     merchant_login: str,
     password_1: str,
@@ -36,37 +60,31 @@ def generate_payment_url(
     out_sum_str = f"{out_sum:.2f}"
     
     # Build signature string: MerchantLogin:OutSum:InvId:Password1:Shp_*
-    # Shp_* parameters must be in alphabetical order
-    shp_params = {
-        "Shp_payment_id": inv_id,
-        "Shp_tariff_id": tariff_id,
-        "Shp_user_id": str(user_id),
-    }
-    shp_str = ":".join(f"{k}={v}" for k, v in sorted(shp_params.items()))
+    # Shp_* parameters must be in alphabetical order (_SHP_KEYS already is)
+    shp_str = (
+        f"{_SHP_KEYS[0]}={inv_id}:{_SHP_KEYS[1]}={tariff_id}:{_SHP_KEYS[2]}={user_id}"
+    )
     
     signature_str = f"{merchant_login}:{out_sum_str}:{inv_id}:{password_1}:{shp_str}"
-    signature = hashlib.md5(signature_str.encode()).hexdigest().upper()
+    signature = _signature(signature_str)
     
     logger.debug(f"Robokassa signature string: {signature_str}")
     logger.debug(f"Robokassa signature: {signature}")
     
-    # Build URL parameters
-    params = {
-        "MerchantLogin": merchant_login,
-        "OutSum": out_sum_str,
-        "InvId": inv_id,
-        "Description": description,
-        "SignatureValue": signature,
-        "Culture": "ru",
-        "Encoding": "utf-8",
-        **shp_params,
-    }
+    # Build URL (quote_plus matches what urlencode produced)
+    url = _PAY_URL_TEMPLATE % (
+        quote_plus(merchant_login),
+        out_sum_str,
+        inv_id,
+        quote_plus(description),
+        signature,
+        inv_id,
+        tariff_id,
+        user_id,
+    )
     
     if test_mode:
-        params["IsTest"] = "1"
-    
-    base_url = "https://auth.robokassa.ru/Merchant/Index.aspx"
-    url = f"{base_url}?{urlencode(params)}"
+        url += "&IsTest=1"
     
     logger.info(f"Generated Robokassa payment URL for InvId={inv_id}, amount={out_sum_str}")
     
@@ -100,14 +118,17 @@ def verify_callback_signature(
     if shp_str:
         signature_str += f":{shp_str}"
     
-    expected_signature = hashlib.md5(signature_str.encode()).hexdigest().upper()
+    expected_signature = _signature(signature_str)
     received_signature = signature.upper()
     
     logger.debug(f"Robokassa callback signature string: {signature_str}")
     logger.debug(f"Expected signature: {expected_signature}")
     logger.debug(f"Received signature: {received_signature}")
     
-    is_valid = received_signature == expected_signature
+    # Constant-time compare: the signature is a shared-secret MAC
+    is_valid = hmac.compare_digest(
+        received_signature.encode(), expected_signature.encode()
+    )
     
     if not is_valid:
         logger.warning(
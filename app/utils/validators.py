@@ -4,14 +4,17 @@ import re
 from urllib.parse import urlparse
 
 
-# Instagram username pattern: 1-30 chars, letters, numbers, dots, underscores
-INSTAGRAM_USERNAME_PATTERN = re.compile(r"^[a-zA-Z0-9._]{1,30}$")
+# Instagram username: 1-30 chars, letters, numbers, dots, underscores
+INSTAGRAM_USERNAME_CHARS = frozenset(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._"
+)
+INSTAGRAM_USERNAME_MAX_LENGTH = 30
 
-# Instagram URL patterns
-INSTAGRAM_URL_PATTERNS = [
-    re.compile(r"(?:https?://)?(?:www\.)?instagram\.com/([a-zA-Z0-9._]{1,30})/?"),
-    re.compile(r"(?:https?://)?(?:www\.)?instagr\.am/([a-zA-Z0-9._]{1,30})/?"),
-]
+# Instagram profile URL (instagram.com or instagr.am), matched in a single pass
+INSTAGRAM_URL_PATTERN = re.compile(
+    r"(?:https?://)?(?:www\.)?(?:instagram\.com|instagr\.am)/([a-zA-Z0-9._]{1,30})/?",
+    re.ASCII,
+)
 
 
 def validate_instagram_username(username: str) -> bool:
@@ -29,7 +32,10 @@ def validate_instagram_username(username: str) -> bool:
     # Remove @ prefix if present
     clean_username = username.lstrip("@")
 
-    return bool(INSTAGRAM_USERNAME_PATTERN.match(clean_username))
+    return (
+        0 < len(clean_username) <= INSTAGRAM_USERNAME_MAX_LENGTH
+        and INSTAGRAM_USERNAME_CHARS.issuperset(clean_username)
+    )
 
 
 def normalize_instagram_username(input_string: str) -> str | None:
@@ -51,9 +57,10 @@ def normalize_instagram_username(input_string: str) -> str | None:
 
     input_string = input_string.strip()
 
-    # Try to extract from URL first
-    for pattern in INSTAGRAM_URL_PATTERNS:
-        match = pattern.search(input_string)
+    # Try to extract from URL first (every match contains the host and
+    # "/", so other input skips the regex)
+    if "instagram.com/" in input_string or "instagr.am/" in input_string:
+        match = INSTAGRAM_URL_PATTERN.search(input_string)
         if match:
             username = match.group(1)
             if validate_instagram_username(username):
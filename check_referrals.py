@@ -7,95 +7,118 @@ from app.config import get_settings
 
 settings = get_settings()
 
+# Shared across calls so repeated checks reuse the connection to the API
+_client = httpx.AsyncClient(
+    timeout=30.0,
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=5),
+)
+
 def get_api_url(path: str) -> str:
     base = settings.api_base_url.rstrip("/")
     return f"{base}/api/v1{path}"
 
+def _unwrap(result: httpx.Response | BaseException) -> httpx.Response:
+    """Return a gathered response, re-raising the error if the request failed."""
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
 async def check_referrals():
     """Check referral system."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # Check a specific user's referral stats
-        print("=== Referral System Check ===\n")
-        
-        # You can change this user_id to check a specific user
-        test_user_id = input("Enter user_id to check (or press Enter for example): ").strip()
-        if not test_user_id:
-            print("No user_id provided. Usage:")
-            print("  python check_referrals.py")
-            print("  Then enter a user_id when prompted")
-            return
-        
-        try:
-            user_id = int(test_user_id)
-        except ValueError:
-            print(f"Invalid user_id: {test_user_id}")
-            return
-        
-        # 1. Check user exists and has referral_code
-        print(f"\n1. Checking user {user_id}...")
-        try:
-            response = await client.get(get_api_url(f"/users/{user_id}/balance"))
-            if response.status_code == 200:
-                user_data = response.json()
-                print(f"   ✓ User exists")
-                print(f"   - Balance: {user_data.get('checks_balance', 0)}")
-                print(f"   - Referral code: {user_data.get('referral_code', 'N/A')}")
-            else:
-                print(f"   ✗ User not found: {response.status_code}")
-                return
-        except Exception as e:
-            print(f"   ✗ Error: {e}")
+    # Check a specific user's referral stats
+    print("=== Referral System Check ===\n")
+    
+    # You can change this user_id to check a specific user
+    test_user_id = input("Enter user_id to check (or press Enter for example): ").strip()
+    if not test_user_id:
+        print("No user_id provided. Usage:")
+        print("  python check_referrals.py")
+        print("  Then enter a user_id when prompted")
+        return
+    
+    try:
+        user_id = int(test_user_id)
+    except ValueError:
+        print(f"Invalid user_id: {test_user_id}")
+        return
+    
+    # The three checks are independent - request them concurrently
+    user_response, stats_response, list_response = await asyncio.gather(
+        _client.get(get_api_url(f"/users/{user_id}/balance")),
+        _client.get(get_api_url("/referrals/stats"), params={"user_id": user_id}),
+        _client.get(
+            get_api_url("/referrals/list"),
+            params={"user_id": user_id, "limit": 10}
+        ),
+        return_exceptions=True,
+    )
+    
+    # 1. Check user exists and has referral_code
+    print(f"\n1. Checking user {user_id}...")
+    try:
+        response = _unwrap(user_response)
+        if response.status_code == 200:
+            user_data = response.json()
+            print(f"   ✓ User exists")
+            print(f"   - Balance: {user_data.get('checks_balance', 0)}")
+            print(f"   - Referral code: {user_data.get('referral_code', 'N/A')}")
+        else:
+            print(f"   ✗ User not found: {response.status_code}")
             return
-        
-        # 2. Check referral stats
-        print(f"\n2. Checking referral stats...")
-        try:
-            response = await client.get(
-                get_api_url("/referrals/stats"),
-                params={"user_id": user_id}
-            )
-            if response.status_code == 200:
-                stats = response.json()
-                print(f"   ✓ Stats retrieved")
-                print(f"   - Total referrals: {stats.get('total_referrals', 0)}")
-                print(f"   - Referrals for bonus: {stats.get('referrals_for_bonus', 0)}")
-                print(f"   - Bonus progress: {stats.get('bonus_progress', 0)}")
-                print(f"   - Total bonuses earned: {stats.get('total_bonuses_earned', 0)}")
-                print(f"   - Referral link: {stats.get('referral_link', 'N/A')}")
-            else:
-                print(f"   ✗ Error getting stats: {response.status_code}")
-                print(f"   Response: {response.text}")
-        except Exception as e:
-            print(f"   ✗ Error: {e}")
-        
-        # 3. Check referral list
-        print(f"\n3. Checking referral list...")
-        try:
-            response = await client.get(
-                get_api_url("/referrals/list"),
-                params={"user_id": user_id, "limit": 10}
-            )
-            if response.status_code == 200:
-                result = response.json()
-                referrals = result.get('referrals', [])
-                print(f"   ✓ List retrieved")
-                print(f"   - Total referrals: {result.get('total', 0)}")
-                if referrals:
-                    print(f"   - Recent referrals:")
-                    for ref in referrals[:5]:
-                        print(f"     • @{ref.get('referred_username', 'N/A')} "
-                              f"(ID: {ref.get('referred_user_id')}, "
-                              f"bonus: {ref.get('bonus_granted', False)})")
-                else:
-                    print(f"   - No referrals found")
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+        return
+    
+    # 2. Check referral stats
+    print(f"\n2. Checking referral stats...")
+    try:
+        response = _unwrap(stats_response)
+        if response.status_code == 200:
+            stats = response.json()
+            print(f"   ✓ Stats retrieved")
+            print(f"   - Total referrals: {stats.get('total_referrals', 0)}")
+            print(f"   - Referrals for bonus: {stats.get('referrals_for_bonus', 0)}")
+            print(f"   - Bonus progress: {stats.get('bonus_progress', 0)}")
+            print(f"   - Total bonuses earned: {stats.get('total_bonuses_earned', 0)}")
+            print(f"   - Referral link: {stats.get('referral_link', 'N/A')}")
+        else:
+            print(f"   ✗ Error getting stats: {response.status_code}")
+            print(f"   Response: {response.text}")
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+    
+    # 3. Check referral list
+    print(f"\n3. Checking referral list...")
+    try:
+        response = _unwrap(list_response)
+        if response.status_code == 200:
+            result = response.json()
+            referrals = result.get('referrals', [])
+            print(f"   ✓ List retrieved")
+            print(f"   - Total referrals: {result.get('total', 0)}")
+            if referrals:
+                print(f"   - Recent referrals:")
+                for ref in referrals[:5]:
+                    print(f"     • @{ref.get('referred_username', 'N/A')} "
+                          f"(ID: {ref.get('referred_user_id')}, "
+                          f"bonus: {ref.get('bonus_granted', False)})")
             else:
-                print(f"   ✗ Error getting list: {response.status_code}")
-                print(f"   Response: {response.text}")
-        except Exception as e:
-            print(f"   ✗ Error: {e}")
-        
-        print("\n=== Check complete ===")
+                print(f"   - No referrals found")
+        else:
+            print(f"   ✗ Error getting list: {response.status_code}")
+            print(f"   Response: {response.text}")
+    except Exception as e:
+        print(f"   ✗ Error: {e}")
+    
+    print("\n=== Check complete ===")
 
-if __name__ == "__main__":
-    asyncio.run(check_referrals())
+async def main():
+    """Run the check and close the HTTP client."""
+    try:
+        await check_referrals()
+    finally:
+        await _client.aclose()
 
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,34 +1,49 @@
 """Pytest configuration and fixtures."""
 
 import asyncio
+import sys
 from typing import AsyncGenerator, Generator
 
 import pytest
 import pytest_asyncio
-from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.models.database import Base, get_session
+from app.services.payment_service import invalidate_tariff_cache
 
 
-# Test database URL (in-memory SQLite for fast tests)
+# Test database URL (in-memory SQLite for fast tests). Each pytest-xdist
+# worker is its own process, so `pytest -n auto` gives every worker a
+# private database and engine without extra setup.
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    """Run every async test in the session-scoped loop shared with session fixtures."""
+    session_loop = pytest.mark.asyncio(scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_loop, append=False)
+
+
 @pytest.fixture(scope="session")
-def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
-    """Create event loop for async tests."""
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
+def event_loop_policy() -> asyncio.AbstractEventLoopPolicy:
+    """Use uvloop (a dev dependency) for async tests; it doesn't support Windows."""
+    if sys.platform == "win32":
+        return asyncio.DefaultEventLoopPolicy()
+    
+    import uvloop
+    
+    return uvloop.EventLoopPolicy()
 
 
-@pytest_asyncio.fixture(scope="function")
+@pytest_asyncio.fixture(scope="session")
 async def test_engine():
-    """Create test database engine."""
+    """Create test database engine and schema once for the whole run."""
     engine = create_async_engine(
         TEST_DATABASE_URL,
         echo=False,
@@ -36,6 +51,16 @@ async def test_engine():
         connect_args={"check_same_thread": False},
     )
     
+    # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs nest inside the
+    # per-test transaction (pysqlite otherwise defers BEGIN on its own)
+    @event.listens_for(engine.sync_engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine.sync_engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     
@@ -47,35 +72,66 @@ async def test_engine():
     await engine.dispose()
 
 
-@pytest_asyncio.fixture(scope="function")
-async def test_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
-    """Create test database session."""
-    async_session = sessionmaker(
+@pytest.fixture(scope="session")
+def test_session_factory(test_engine) -> async_sessionmaker[AsyncSession]:
+    """Create the session factory used for test sessions."""
+    return async_sessionmaker(
         test_engine,
-        class_=AsyncSession,
         expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
     )
+
+
+@pytest_asyncio.fixture(scope="function")
+async def test_session(
+    test_engine, test_session_factory: async_sessionmaker[AsyncSession]
+) -> AsyncGenerator[AsyncSession, None]:
+    """Create test database session inside a transaction rolled back after the test.
     
-    async with async_session() as session:
-        yield session
+    Commits made by the test or the code under test only release a SAVEPOINT,
+    so every test starts from an empty schema without re-running DDL.
+    """
+    async with test_engine.connect() as conn:
+        trans = await conn.begin()
+        
+        async with test_session_factory(bind=conn) as session:
+            yield session
+        
+        await trans.rollback()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def api_client() -> AsyncGenerator[AsyncClient, None]:
+    """Create one HTTP client bound to the app for the whole run."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
 
 
 @pytest_asyncio.fixture(scope="function")
-async def client(test_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
-    """Create test HTTP client with overridden database session."""
+async def client(
+    api_client: AsyncClient, test_session: AsyncSession
+) -> AsyncGenerator[AsyncClient, None]:
+    """Provide the shared HTTP client with the database session overridden for this test."""
     
     async def override_get_session():
         yield test_session
     
     app.dependency_overrides[get_session] = override_get_session
     
-    async with AsyncClient(app=app, base_url="http://test") as ac:
-        yield ac
+    yield api_client
     
     app.dependency_overrides.clear()
 
 
-@pytest.fixture
+@pytest.fixture(autouse=True)
+def clear_tariff_cache() -> Generator[None, None, None]:
+    """Keep the process-local tariff cache from leaking between tests."""
+    invalidate_tariff_cache()
+    yield
+    invalidate_tariff_cache()
+
+
+@pytest.fixture(scope="session")
 def sample_user_data() -> dict:
     """Sample user data for testing."""
     return {
@@ -85,7 +141,7 @@ def sample_user_data() -> dict:
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_tariff_data() -> dict:
     """Sample tariff data for testing."""
     return {
@@ -0,0 +1,7 @@
+"""Constants shared by test modules."""
+
+import uuid
+
+
+# ID that matches no row: uuid4() always sets version 4, this one is version 0
+MISSING_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
@@ -1,13 +1,13 @@
 """Tests for payment API endpoints."""
 
-import uuid
-
 import pytest
 from httpx import AsyncClient
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.models import Tariff, User
+from app.models.models import Payment, Tariff, User
+from app.services.payment_service import create_telegram_stars_payment
+from tests.constants import MISSING_ID
 
 
 class TestTelegramStarsPayments:
@@ -40,13 +40,25 @@ class TestTelegramStarsPayments:
         )
         test_session.add(tariff)
         
-        await test_session.commit()
-        await test_session.refresh(user)
-        await test_session.refresh(tariff)
+        await test_session.flush()
         
         return user, tariff
 
-    @pytest.mark.asyncio
+    @pytest.fixture
+    async def created_stars_payment(
+        self, test_session: AsyncSession, user_with_tariff: tuple[User, Tariff]
+    ) -> Payment:
+        """Create a pending Stars payment through the service layer."""
+        user, tariff = user_with_tariff
+        
+        payment, _ = await create_telegram_stars_payment(
+            session=test_session,
+            user_id=user.user_id,
+            tariff_id=tariff.tariff_id,
+        )
+        
+        return payment
+
     async def test_create_stars_payment(
         self, client: AsyncClient, user_with_tariff: tuple[User, Tariff]
     ):
@@ -71,56 +83,35 @@ class TestTelegramStarsPayments:
         assert data["currency"] == "XTR"
         assert data["status"] == "pending"
 
-    @pytest.mark.asyncio
-    async def test_create_stars_payment_user_not_found(
-        self, client: AsyncClient, user_with_tariff: tuple[User, Tariff]
-    ):
-        """Test creating payment with non-existent user."""
-        _, tariff = user_with_tariff
-        
-        response = await client.post(
-            "/api/v1/payments/telegram-stars/create",
-            json={
-                "user_id": 999999999,
-                "tariff_id": str(tariff.tariff_id),
-            },
-        )
-        
-        assert response.status_code == 404
-
-    @pytest.mark.asyncio
-    async def test_create_stars_payment_tariff_not_found(
-        self, client: AsyncClient, user_with_tariff: tuple[User, Tariff]
+    @pytest.mark.parametrize("bad_field", ["user_id", "tariff_id"])
+    async def test_create_stars_payment_not_found(
+        self, client: AsyncClient, user_with_tariff: tuple[User, Tariff], bad_field: str
     ):
-        """Test creating payment with non-existent tariff."""
-        user, _ = user_with_tariff
+        """Test creating payment with non-existent user or tariff."""
+        user, tariff = user_with_tariff
+        payload = {
+            "user_id": user.user_id,
+            "tariff_id": str(tariff.tariff_id),
+        }
+        payload[bad_field] = 999999999 if bad_field == "user_id" else str(MISSING_ID)
         
         response = await client.post(
             "/api/v1/payments/telegram-stars/create",
-            json={
-                "user_id": user.user_id,
-                "tariff_id": str(uuid.uuid4()),
-            },
+            json=payload,
         )
         
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_validate_stars_payment(
-        self, client: AsyncClient, user_with_tariff: tuple[User, Tariff]
+        self,
+        client: AsyncClient,
+        user_with_tariff: tuple[User, Tariff],
+        created_stars_payment: Payment,
     ):
         """Test validating a Telegram Stars payment."""
         user, tariff = user_with_tariff
         
-        # Create payment first
-        create_response = await client.post(
-            "/api/v1/payments/telegram-stars/create",
-            json={
-                "user_id": user.user_id,
-                "tariff_id": str(tariff.tariff_id),
-            },
-        )
-        payment_id = create_response.json()["payment_id"]
+        payment_id = str(created_stars_payment.payment_id)
         
         # Validate payment
         response = await client.post(
@@ -132,22 +123,11 @@ class TestTelegramStarsPayments:
         data = response.json()
         assert data["valid"] is True
 
-    @pytest.mark.asyncio
     async def test_validate_stars_payment_amount_mismatch(
-        self, client: AsyncClient, user_with_tariff: tuple[User, Tariff]
+        self, client: AsyncClient, created_stars_payment: Payment
     ):
         """Test validating payment with wrong amount."""
-        user, tariff = user_with_tariff
-        
-        # Create payment first
-        create_response = await client.post(
-            "/api/v1/payments/telegram-stars/create",
-            json={
-                "user_id": user.user_id,
-                "tariff_id": str(tariff.tariff_id),
-            },
-        )
-        payment_id = create_response.json()["payment_id"]
+        payment_id = str(created_stars_payment.payment_id)
         
         # Validate with wrong amount
         response = await client.post(
@@ -157,22 +137,16 @@ class TestTelegramStarsPayments:
         
         assert response.status_code == 400
 
-    @pytest.mark.asyncio
     async def test_complete_stars_payment(
-        self, client: AsyncClient, user_with_tariff: tuple[User, Tariff]
+        self,
+        client: AsyncClient,
+        user_with_tariff: tuple[User, Tariff],
+        created_stars_payment: Payment,
     ):
         """Test completing a Telegram Stars payment."""
         user, tariff = user_with_tariff
         
-        # Create payment first
-        create_response = await client.post(
-            "/api/v1/payments/telegram-stars/create",
-            json={
-                "user_id": user.user_id,
-                "tariff_id": str(tariff.tariff_id),
-            },
-        )
-        payment_id = create_response.json()["payment_id"]
+        payment_id = str(created_stars_payment.payment_id)
         
         # Complete payment
         response = await client.post(
@@ -190,22 +164,16 @@ class TestTelegramStarsPayments:
         assert data["checks_added"] == tariff.checks_count
         assert data["user_checks_balance"] == tariff.checks_count
 
-    @pytest.mark.asyncio
     async def test_complete_stars_payment_idempotent(
-        self, client: AsyncClient, user_with_tariff: tuple[User, Tariff]
+        self,
+        client: AsyncClient,
+        user_with_tariff: tuple[User, Tariff],
+        created_stars_payment: Payment,
     ):
         """Test that completing payment twice is idempotent."""
         user, tariff = user_with_tariff
         
-        # Create payment
-        create_response = await client.post(
-            "/api/v1/payments/telegram-stars/create",
-            json={
-                "user_id": user.user_id,
-                "tariff_id": str(tariff.tariff_id),
-            },
-        )
-        payment_id = create_response.json()["payment_id"]
+        payment_id = str(created_stars_payment.payment_id)
         
         # Complete payment twice
         complete_request = {
@@ -232,47 +200,44 @@ class TestTariffEndpoints:
     """Tests for tariff endpoints."""
 
     @pytest.fixture
-    async def active_tariffs(self, test_session: AsyncSession) -> list[Tariff]:
+    async def active_tariffs(self, test_session: AsyncSession) -> list[dict]:
         """Create active tariffs for testing."""
         tariffs = [
-            Tariff(
-                name="Basic",
-                description="1 check",
-                checks_count=1,
-                price_rub=99,
-                price_stars=100,
-                is_active=True,
-                sort_order=1,
-            ),
-            Tariff(
-                name="Pro",
-                description="5 checks",
-                checks_count=5,
-                price_rub=399,
-                price_stars=400,
-                is_active=True,
-                sort_order=2,
-            ),
-            Tariff(
-                name="Inactive",
-                description="Should not appear",
-                checks_count=10,
-                price_rub=999,
-                price_stars=1000,
-                is_active=False,
-                sort_order=3,
-            ),
+            {
+                "name": "Basic",
+                "description": "1 check",
+                "checks_count": 1,
+                "price_rub": 99,
+                "price_stars": 100,
+                "is_active": True,
+                "sort_order": 1,
+            },
+            {
+                "name": "Pro",
+                "description": "5 checks",
+                "checks_count": 5,
+                "price_rub": 399,
+                "price_stars": 400,
+                "is_active": True,
+                "sort_order": 2,
+            },
+            {
+                "name": "Inactive",
+                "description": "Should not appear",
+                "checks_count": 10,
+                "price_rub": 999,
+                "price_stars": 1000,
+                "is_active": False,
+                "sort_order": 3,
+            },
         ]
         
-        for tariff in tariffs:
-            test_session.add(tariff)
-        
-        await test_session.commit()
+        # Seed rows only - one batched INSERT, no ORM objects to track
+        await test_session.execute(insert(Tariff), tariffs)
         
         return tariffs
 
-    @pytest.mark.asyncio
-    async def test_get_tariffs(self, client: AsyncClient, active_tariffs: list[Tariff]):
+    async def test_get_tariffs(self, client: AsyncClient, active_tariffs: list[dict]):
         """Test getting active tariffs."""
         response = await client.get("/api/v1/tariffs")
         
@@ -0,0 +1,137 @@
+"""Tests for referral API endpoints."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.referrals import _decode_cursor, _encode_cursor
+from app.models.models import Referral, User
+from app.services import referral_service
+
+
+REFERRER_ID = 500
+
+
+class TestReferralList:
+    """Tests for the referral list endpoint."""
+
+    @pytest.fixture
+    async def referrals(
+        self, test_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+    ) -> list[Referral]:
+        """Create a referrer with three referrals, two sharing a created_at."""
+        # The service opens its own sessions; bind them to the test transaction
+        conn = await test_session.connection()
+        monkeypatch.setattr(
+            referral_service,
+            "async_session_maker",
+            lambda: AsyncSession(
+                bind=conn,
+                join_transaction_mode="create_savepoint",
+                expire_on_commit=False,
+            ),
+        )
+        
+        older = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        newer = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        users = [
+            User(user_id=user_id, username=f"user_{user_id}", referral_code=f"ref_{user_id}")
+            for user_id in (REFERRER_ID, 501, 502, 503)
+        ]
+        referrals = [
+            Referral(referrer_user_id=REFERRER_ID, referred_user_id=501, created_at=older),
+            Referral(referrer_user_id=REFERRER_ID, referred_user_id=502, created_at=newer),
+            Referral(referrer_user_id=REFERRER_ID, referred_user_id=503, created_at=newer),
+        ]
+        test_session.add_all(users)
+        await test_session.flush()
+        test_session.add_all(referrals)
+        await test_session.flush()
+        
+        return referrals
+
+    async def test_cursor_pages_through_all_referrals(
+        self, client: AsyncClient, referrals: list[Referral]
+    ):
+        """Test that following next_cursor returns every referral exactly once."""
+        response1 = await client.get(
+            "/api/v1/referrals/list",
+            params={"user_id": REFERRER_ID, "limit": 2},
+        )
+        assert response1.status_code == 200
+        page1 = response1.json()
+        assert page1["total"] == 3
+        assert len(page1["referrals"]) == 2
+        assert page1["next_cursor"] is not None
+        
+        response2 = await client.get(
+            "/api/v1/referrals/list",
+            params={"user_id": REFERRER_ID, "limit": 2, "cursor": page1["next_cursor"]},
+        )
+        assert response2.status_code == 200
+        page2 = response2.json()
+        assert page2["total"] == 3
+        assert page2["next_cursor"] is None
+        
+        # Same-timestamp referrals are split by referral_id, none skipped or repeated
+        seen = [r["referred_user_id"] for r in page1["referrals"] + page2["referrals"]]
+        assert sorted(seen[:2]) == [502, 503]
+        assert seen[2:] == [501]
+
+    async def test_zero_limit_returns_empty_page(
+        self, client: AsyncClient, referrals: list[Referral]
+    ):
+        """Test that limit=0 returns no referrals but the full total."""
+        response = await client.get(
+            "/api/v1/referrals/list",
+            params={"user_id": REFERRER_ID, "limit": 0},
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["referrals"] == []
+        assert data["total"] == 3
+        assert data["next_cursor"] is None
+
+    async def test_referral_without_user_row(
+        self, client: AsyncClient, test_session: AsyncSession, referrals: list[Referral]
+    ):
+        """Test that a referral whose referred user row is gone is still listed."""
+        # SQLite doesn't enforce the foreign key, so the orphan can be inserted
+        test_session.add(Referral(referrer_user_id=REFERRER_ID, referred_user_id=504))
+        await test_session.flush()
+        
+        response = await client.get(
+            "/api/v1/referrals/list",
+            params={"user_id": REFERRER_ID},
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 4
+        orphan = next(r for r in data["referrals"] if r["referred_user_id"] == 504)
+        assert orphan["referred_username"] is None
+
+    async def test_invalid_cursor(self, client: AsyncClient):
+        """Test that a malformed cursor is rejected."""
+        response = await client.get(
+            "/api/v1/referrals/list",
+            params={"user_id": REFERRER_ID, "cursor": "not-a-cursor"},
+        )
+        
+        assert response.status_code == 400
+
+    def test_cursor_round_trip_is_url_safe(self):
+        """Test that a cursor with a UTC offset survives an unencoded query string."""
+        cursor = (
+            datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=3))),
+            uuid.uuid4(),
+        )
+        
+        encoded = _encode_cursor(cursor)
+        
+        assert "+" not in encoded and "/" not in encoded
+        assert _decode_cursor(encoded) == cursor
@@ -1,16 +1,15 @@
 """Tests for the main API router endpoints."""
 
-import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.models import User
+from tests.constants import MISSING_ID
 
 
 class TestHealthEndpoint:
     """Tests for the health check endpoint."""
 
-    @pytest.mark.asyncio
     async def test_health_check(self, client: AsyncClient):
         """Test health check returns OK."""
         response = await client.get("/health")
@@ -22,7 +21,6 @@ class TestHealthEndpoint:
 class TestUserEndpoints:
     """Tests for user-related endpoints."""
 
-    @pytest.mark.asyncio
     async def test_ensure_user_creates_new_user(
         self, client: AsyncClient, sample_user_data: dict
     ):
@@ -37,7 +35,6 @@ class TestUserEndpoints:
         assert data["checks_balance"] == 0  # Regular users get 0 checks
         assert data["referral_code"] is not None
 
-    @pytest.mark.asyncio
     async def test_ensure_user_returns_existing_user(
         self, client: AsyncClient, sample_user_data: dict
     ):
@@ -61,7 +58,6 @@ class TestUserEndpoints:
         assert data1["user_id"] == data2["user_id"]
         assert data1["referral_code"] == data2["referral_code"]
 
-    @pytest.mark.asyncio
     async def test_get_user_balance(
         self, client: AsyncClient, sample_user_data: dict
     ):
@@ -78,13 +74,11 @@ class TestUserEndpoints:
         assert data["user_id"] == sample_user_data["user_id"]
         assert "checks_balance" in data
 
-    @pytest.mark.asyncio
     async def test_get_balance_user_not_found(self, client: AsyncClient):
         """Test getting balance for non-existent user."""
         response = await client.get("/api/v1/users/999999999/balance")
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_add_user_balance(
         self, client: AsyncClient, sample_user_data: dict
     ):
@@ -106,7 +100,6 @@ class TestUserEndpoints:
 class TestCheckEndpoints:
     """Tests for check-related endpoints."""
 
-    @pytest.mark.asyncio
     async def test_initiate_check_insufficient_balance(
         self, client: AsyncClient, sample_user_data: dict
     ):
@@ -125,15 +118,12 @@ class TestCheckEndpoints:
         )
         assert response.status_code == 402  # Payment required
 
-    @pytest.mark.asyncio
     async def test_get_check_not_found(self, client: AsyncClient):
         """Test getting non-existent check."""
-        import uuid
-        fake_check_id = uuid.uuid4()
+        fake_check_id = MISSING_ID
         response = await client.get(f"/api/v1/check/{fake_check_id}")
         assert response.status_code == 404
 
-    @pytest.mark.asyncio
     async def test_get_user_checks_empty(
         self, client: AsyncClient, sample_user_data: dict
     ):
@@ -154,7 +144,6 @@ class TestCheckEndpoints:
 class TestQueueEndpoints:
     """Tests for queue-related endpoints."""
 
-    @pytest.mark.asyncio
     async def test_get_queue_status(self, client: AsyncClient):
         """Test getting queue status."""
         response = await client.get("/api/v1/queue/status")
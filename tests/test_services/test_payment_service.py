@@ -1,9 +1,11 @@
 """Tests for payment service."""
 
-import uuid
+from typing import AsyncGenerator
 
 import pytest
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.models.models import Payment, PaymentStatusEnum, Tariff, User
 from app.services.payment_service import (
@@ -16,8 +18,10 @@ from app.services.payment_service import (
     complete_telegram_stars_payment,
     create_telegram_stars_payment,
     fail_telegram_stars_payment,
+    get_tariff_cached,
     validate_telegram_stars_payment,
 )
+from tests.constants import MISSING_ID
 
 
 class TestCreateTelegramStarsPayment:
@@ -42,12 +46,9 @@ class TestCreateTelegramStarsPayment:
         )
         test_session.add(user)
         test_session.add(tariff)
-        await test_session.commit()
-        await test_session.refresh(user)
-        await test_session.refresh(tariff)
+        await test_session.flush()
         return user, tariff
 
-    @pytest.mark.asyncio
     async def test_create_payment_success(
         self, test_session: AsyncSession, setup_data: tuple[User, Tariff]
     ):
@@ -68,35 +69,98 @@ class TestCreateTelegramStarsPayment:
         assert payment.status == PaymentStatusEnum.PENDING
         assert returned_tariff.name == tariff.name
 
-    @pytest.mark.asyncio
-    async def test_create_payment_user_not_found(
-        self, test_session: AsyncSession, setup_data: tuple[User, Tariff]
+    @pytest.fixture
+    async def tariff_selects(self, test_session: AsyncSession) -> AsyncGenerator[list[str], None]:
+        """Record the SELECTs on the tariffs table run during the test."""
+        conn = await test_session.connection()
+        statements: list[str] = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith("SELECT") and "FROM tariffs" in statement:
+                statements.append(statement)
+        
+        event.listen(conn.sync_connection, "after_cursor_execute", record)
+        yield statements
+        event.remove(conn.sync_connection, "after_cursor_execute", record)
+
+    async def test_create_payment_with_cached_tariff(
+        self,
+        test_session: AsyncSession,
+        setup_data: tuple[User, Tariff],
+        tariff_selects: list[str],
     ):
-        """Test payment creation with non-existent user."""
-        _, tariff = setup_data
+        """Test that repeated payment creation reads the tariff from the cache."""
+        user, tariff = setup_data
+        conn = await test_session.connection()
         
-        with pytest.raises(UserNotFoundError):
-            await create_telegram_stars_payment(
-                session=test_session,
-                user_id=999999,
-                tariff_id=tariff.tariff_id,
-            )
+        # Separate sessions, so the identity map can't serve the tariff either
+        payments = []
+        for _ in range(2):
+            async with AsyncSession(
+                bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False
+            ) as session:
+                payments.append(await create_telegram_stars_payment(
+                    session=session,
+                    user_id=user.user_id,
+                    tariff_id=tariff.tariff_id,
+                ))
+        (first, _), (second, cached_tariff) = payments
+        
+        assert len(tariff_selects) == 1
+        assert first.payment_id != second.payment_id
+        assert second.amount == tariff.price_stars
+        assert cached_tariff.checks_count == tariff.checks_count
 
-    @pytest.mark.asyncio
-    async def test_create_payment_tariff_not_found(
-        self, test_session: AsyncSession, setup_data: tuple[User, Tariff]
+    async def test_create_payment_cached_tariff_after_rollback(
+        self,
+        test_session: AsyncSession,
+        setup_data: tuple[User, Tariff],
+        tariff_selects: list[str],
     ):
-        """Test payment creation with non-existent tariff."""
-        user, _ = setup_data
+        """Test that a rollback of the session that cached a tariff doesn't break later hits."""
+        user, tariff = setup_data
+        conn = await test_session.connection()
         
-        with pytest.raises(TariffNotFoundError):
-            await create_telegram_stars_payment(
-                session=test_session,
+        # One session loads the tariff into the cache, then rolls back
+        async with AsyncSession(
+            bind=conn, join_transaction_mode="create_savepoint"
+        ) as first_session:
+            await get_tariff_cached(first_session, tariff.tariff_id)
+            await first_session.rollback()
+        
+        # A fresh session is then served from the cache
+        async with AsyncSession(
+            bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False
+        ) as second_session:
+            payment, cached_tariff = await create_telegram_stars_payment(
+                session=second_session,
                 user_id=user.user_id,
-                tariff_id=uuid.uuid4(),
+                tariff_id=tariff.tariff_id,
             )
+        
+        assert len(tariff_selects) == 1
+        assert payment.amount == tariff.price_stars
+        assert cached_tariff.checks_count == tariff.checks_count
+
+    @pytest.mark.parametrize(
+        ("bad_field", "error"),
+        [("user_id", UserNotFoundError), ("tariff_id", TariffNotFoundError)],
+    )
+    async def test_create_payment_not_found(
+        self,
+        test_session: AsyncSession,
+        setup_data: tuple[User, Tariff],
+        bad_field: str,
+        error: type[Exception],
+    ):
+        """Test payment creation with non-existent user or tariff."""
+        user, tariff = setup_data
+        kwargs = {"user_id": user.user_id, "tariff_id": tariff.tariff_id}
+        kwargs[bad_field] = 999999 if bad_field == "user_id" else MISSING_ID
+        
+        with pytest.raises(error):
+            await create_telegram_stars_payment(session=test_session, **kwargs)
 
-    @pytest.mark.asyncio
     async def test_create_payment_inactive_tariff(
         self, test_session: AsyncSession, setup_data: tuple[User, Tariff]
     ):
@@ -135,27 +199,21 @@ class TestCompleteTelegramStarsPayment:
             is_active=True,
             sort_order=1,
         )
-        test_session.add(user)
-        test_session.add(tariff)
-        await test_session.flush()
-        
         payment = Payment(
-            user_id=user.user_id,
-            tariff_id=tariff.tariff_id,
+            user=user,
+            tariff=tariff,
             amount=100,
             currency="XTR",
             checks_count=3,
             payment_method="telegram_stars",
             status=PaymentStatusEnum.PENDING,
         )
-        test_session.add(payment)
-        await test_session.commit()
-        await test_session.refresh(payment)
-        await test_session.refresh(user)
+        # One flush inserts all three in foreign-key order
+        test_session.add_all([user, tariff, payment])
+        await test_session.flush()
         
         return payment, user, tariff
 
-    @pytest.mark.asyncio
     async def test_complete_payment_success(
         self, test_session: AsyncSession, pending_payment: tuple[Payment, User, Tariff]
     ):
@@ -174,18 +232,16 @@ class TestCompleteTelegramStarsPayment:
         assert completed_payment.telegram_payment_charge_id == "charge_123"
         assert updated_user.checks_balance == initial_balance + tariff.checks_count
 
-    @pytest.mark.asyncio
     async def test_complete_payment_not_found(self, test_session: AsyncSession):
         """Test completing non-existent payment."""
         with pytest.raises(PaymentNotFoundError):
             await complete_telegram_stars_payment(
                 session=test_session,
-                payment_id=uuid.uuid4(),
+                payment_id=MISSING_ID,
                 telegram_payment_charge_id="charge_123",
                 total_amount=100,
             )
 
-    @pytest.mark.asyncio
     async def test_complete_payment_amount_mismatch(
         self, test_session: AsyncSession, pending_payment: tuple[Payment, User, Tariff]
     ):
@@ -200,7 +256,6 @@ class TestCompleteTelegramStarsPayment:
                 total_amount=999,  # Wrong amount
             )
 
-    @pytest.mark.asyncio
     async def test_complete_payment_idempotent(
         self, test_session: AsyncSession, pending_payment: tuple[Payment, User, Tariff]
     ):
@@ -226,6 +281,32 @@ class TestCompleteTelegramStarsPayment:
         # Balance should not be doubled
         assert updated_user.checks_balance == tariff.checks_count
 
+    async def test_complete_payment_stale_status_not_double_credited(
+        self, test_session: AsyncSession, pending_payment: tuple[Payment, User, Tariff]
+    ):
+        """Test that a completion racing on a stale PENDING read credits only once."""
+        payment, user, tariff = pending_payment
+        
+        await complete_telegram_stars_payment(
+            session=test_session,
+            payment_id=payment.payment_id,
+            telegram_payment_charge_id="charge_123",
+            total_amount=100,
+        )
+        
+        # Simulate a concurrent caller that read the row before it was completed
+        set_committed_value(payment, "status", PaymentStatusEnum.PENDING)
+        
+        completed_payment, updated_user = await complete_telegram_stars_payment(
+            session=test_session,
+            payment_id=payment.payment_id,
+            telegram_payment_charge_id="charge_123",
+            total_amount=100,
+        )
+        
+        assert completed_payment.status == PaymentStatusEnum.COMPLETED
+        assert updated_user.checks_balance == tariff.checks_count
+
 
 class TestFailTelegramStarsPayment:
     """Tests for fail_telegram_stars_payment function."""
@@ -247,26 +328,21 @@ class TestFailTelegramStarsPayment:
             is_active=True,
             sort_order=1,
         )
-        test_session.add(user)
-        test_session.add(tariff)
-        await test_session.flush()
-        
         payment = Payment(
-            user_id=user.user_id,
-            tariff_id=tariff.tariff_id,
+            user=user,
+            tariff=tariff,
             amount=50,
             currency="XTR",
             checks_count=1,
             payment_method="telegram_stars",
             status=PaymentStatusEnum.PENDING,
         )
-        test_session.add(payment)
-        await test_session.commit()
-        await test_session.refresh(payment)
+        # One flush inserts all three in foreign-key order
+        test_session.add_all([user, tariff, payment])
+        await test_session.flush()
         
         return payment
 
-    @pytest.mark.asyncio
     async def test_fail_payment_success(
         self, test_session: AsyncSession, pending_payment: Payment
     ):
@@ -280,7 +356,6 @@ class TestFailTelegramStarsPayment:
         
         assert failed_payment.status == PaymentStatusEnum.FAILED
 
-    @pytest.mark.asyncio
     async def test_fail_completed_payment(
         self, test_session: AsyncSession, pending_payment: Payment
     ):
@@ -0,0 +1,73 @@
+"""Tests for queue service."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Check, CheckStatusEnum, User
+from app.services import queue_service
+from app.services.queue_service import update_queue_positions
+
+
+class TestUpdateQueuePositions:
+    """Tests for update_queue_positions function."""
+
+    @pytest.fixture(autouse=True)
+    async def bind_service_sessions(
+        self, test_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Bind the service's own sessions to the test transaction."""
+        conn = await test_session.connection()
+        monkeypatch.setattr(
+            queue_service,
+            "async_session_maker",
+            lambda: AsyncSession(
+                bind=conn,
+                join_transaction_mode="create_savepoint",
+                expire_on_commit=False,
+            ),
+        )
+
+    async def test_pending_positions_renumbered_in_order(self, test_session: AsyncSession):
+        """Test that gaps are closed and pending checks get 1..n in created_at order."""
+        user = User(user_id=700, username="queue_user", referral_code="ref_700")
+        test_session.add(user)
+        await test_session.flush()
+        
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        pending = [
+            Check(
+                user_id=user.user_id,
+                target_username=f"target_{i}",
+                status=CheckStatusEnum.PENDING,
+                queue_position=position,
+                created_at=start + timedelta(minutes=i),
+            )
+            for i, position in enumerate([3, 7, 12])
+        ]
+        processing = Check(
+            user_id=user.user_id,
+            target_username="processing",
+            status=CheckStatusEnum.PROCESSING,
+            queue_position=1,
+            created_at=start - timedelta(minutes=1),
+        )
+        test_session.add_all([*pending, processing])
+        await test_session.flush()
+        processing_id = processing.check_id
+        
+        await update_queue_positions()
+        
+        rows = (await test_session.execute(
+            select(Check.target_username, Check.queue_position)
+            .where(Check.status == CheckStatusEnum.PENDING)
+            .order_by(Check.created_at.asc())
+        )).all()
+        assert rows == [("target_0", 1), ("target_1", 2), ("target_2", 3)]
+        
+        # Checks already being processed keep their position
+        assert await test_session.scalar(
+            select(Check.queue_position).where(Check.check_id == processing_id)
+        ) == 1
@@ -0,0 +1,68 @@
+"""Tests for Instagram session service."""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import InstagramSession
+from app.services import session_service
+from app.services.session_service import _session_rotation_statements, save_session_id
+
+
+class TestSaveSessionId:
+    """Tests for save_session_id function."""
+
+    @pytest.fixture(autouse=True)
+    async def bind_service_sessions(
+        self, test_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Bind the service's own sessions to the test transaction."""
+        conn = await test_session.connection()
+        monkeypatch.setattr(
+            session_service,
+            "async_session_maker",
+            lambda: AsyncSession(
+                bind=conn,
+                join_transaction_mode="create_savepoint",
+                expire_on_commit=False,
+            ),
+        )
+        # Restore the module-level cache after the test
+        monkeypatch.setattr(session_service, "_cached_session_id", None)
+        monkeypatch.setattr(session_service, "_cache_expires_at", 0.0)
+        monkeypatch.setattr(session_service, "_last_invalidated", (None, 0.0))
+
+    async def test_save_replaces_active_session(self, test_session: AsyncSession):
+        """Test that saving a session deactivates the previous one."""
+        first = await save_session_id("first_session_id", notes="first")
+        second = await save_session_id("second_session_id")
+        
+        assert second.id != first.id
+        assert second.is_active is True
+        assert second.is_valid is True
+        assert second.created_at is not None
+        
+        rows = (await test_session.execute(
+            select(InstagramSession.session_id, InstagramSession.is_active)
+            .order_by(InstagramSession.id)
+        )).all()
+        assert rows == [("first_session_id", False), ("second_session_id", True)]
+        assert session_service.get_active_session_id_sync() == "second_session_id"
+
+    def test_postgres_deactivates_in_insert_cte(self):
+        """Test that PostgreSQL runs the deactivation inside the INSERT."""
+        deactivate, create = _session_rotation_statements("postgresql", "new_session_id", None)
+        
+        assert deactivate is None
+        sql = str(create.compile(dialect=postgresql.dialect()))
+        assert sql.startswith("WITH deactivated AS \n(UPDATE instagram_sessions SET is_active=")
+        assert "INSERT INTO instagram_sessions" in sql
+        assert "RETURNING instagram_sessions.id, instagram_sessions.session_id" in sql
+
+    def test_other_dialects_deactivate_first(self):
+        """Test that other dialects get a separate UPDATE and a plain INSERT."""
+        deactivate, create = _session_rotation_statements("sqlite", "new_session_id", None)
+        
+        assert deactivate is not None
+        assert "WITH" not in str(create.compile(dialect=postgresql.dialect()))